@@ -0,0 +1,110 @@
+"""
+Helpers shared by wordpiece_tokenizer and search_algorithms
+============================================================
+  * ``write_sections`` / ``SectionFile`` - the binary container behind
+    ``WordPieceTokenizer.save`` and ``CorpusIndex.save``: typed arrays that
+    are memory-mapped on load and viewed in place.
+  * ``PickleByConfig`` - pickling for objects holding locks or mappings,
+    which are rebuilt from their constructor arguments instead.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import struct
+import sys
+from array import array
+from typing import Dict, List, Tuple
+
+# File layout:
+#
+#   magic (8 bytes) | uint32 header length | JSON header (space-padded to an
+#   8-byte boundary) | arrays, each starting on an 8-byte boundary
+#
+# header["sections"] maps each array present to [offset, size in bytes],
+# offsets relative to the end of the header. Arrays are little-endian: a
+# big-endian writer byteswaps them, and big-endian readers are refused
+# rather than handed views in the wrong byte order.
+
+
+class PickleByConfig:
+    """
+    Pickle only the constructor arguments named in ``_PICKLED`` and call
+    ``__init__`` with them on unpickling.
+
+    Locks cannot be pickled and mapped files should not be copied (e.g. when
+    an object is shipped to pool workers), so the receiving process starts
+    from the same configuration: an empty cache, a re-opened file.
+    """
+
+    _PICKLED: Tuple[str, ...] = ()
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self._PICKLED}
+
+    def __setstate__(self, state) -> None:
+        self.__init__(**state)
+
+
+def write_sections(path: str, magic: bytes, sections: List[Tuple[str, str]],
+                   arrays: Dict[str, array], meta: dict) -> None:
+    """Write ``meta`` and the ``arrays`` listed in ``sections`` to ``path``."""
+    header = dict(meta, sections={})
+    names = [name for name, _ in sections if name in arrays]
+    offset = 0
+    for name in names:
+        size = len(arrays[name]) * arrays[name].itemsize
+        header["sections"][name] = [offset, size]
+        offset += size + (-size % 8)
+    raw_header = json.dumps(header).encode("utf-8")
+    raw_header += b" " * (-(len(magic) + 4 + len(raw_header)) % 8)
+
+    with open(path, "wb") as f:
+        f.write(magic + struct.pack("<I", len(raw_header)) + raw_header)
+        for name in names:
+            data = arrays[name]
+            if sys.byteorder != "little" and data.itemsize > 1:
+                data = array(data.typecode, data)
+                data.byteswap()
+            f.write(data.tobytes())
+            f.write(b"\0" * (-f.tell() % 8))
+
+
+class SectionFile(PickleByConfig):
+    """
+    Typed, read-only views over a file written by :func:`write_sections`.
+
+    Subclasses set ``MAGIC``, ``SECTIONS`` and ``KIND`` (for messages); every
+    section present becomes an attribute of that name, and ``meta`` holds
+    the rest of the header.
+    """
+
+    MAGIC = b""
+    SECTIONS: List[Tuple[str, str]] = []
+    KIND = "section"
+    _PICKLED = ("path", "use_mmap")
+
+    def __init__(self, path: str, use_mmap: bool = True):
+        if sys.byteorder != "little":
+            raise NotImplementedError(f"{self.KIND} files require a little-endian host")
+        self.path, self.use_mmap = path, use_mmap
+        with open(path, "rb") as f:
+            if use_mmap:
+                self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self._buffer = f.read()
+        view = memoryview(self._buffer)
+        if bytes(view[:len(self.MAGIC)]) != self.MAGIC:
+            raise ValueError(f"{path} is not a {self.KIND} file")
+        (header_len,) = struct.unpack_from("<I", view, len(self.MAGIC))
+        start = len(self.MAGIC) + 4
+        self.meta = json.loads(bytes(view[start:start + header_len]))
+        base = start + header_len
+        for name, typecode in self.SECTIONS:
+            if name in self.meta["sections"]:
+                offset, size = self.meta["sections"][name]
+                setattr(self, name, view[base + offset:base + offset + size].cast(typecode))
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.meta["sections"]
@@ -0,0 +1,511 @@
+"""
+Benchmark Suite
+===============
+Reproducible performance measurements for the three modules in this repo:
+
+  1. wordpiece_tokenizer   - WordPieceTrainer.train, WordPieceTokenizer.encode
+  2. search_algorithms     - every search class: build time, p50/p99 query
+                             latency, peak RSS
+  3. salary-predictor(ML)  - fit (sklearn, streaming, CV sweep) and predict
+                             (artifact load, single row, predict_many)
+
+Corpora are generated from a Zipfian distribution over synthetic pseudo-words
+(frequent words are short, as in natural text) and every generator is seeded,
+so the same command produces the same data on every commit. Each case runs in
+a fresh process so its peak RSS is its own.
+
+Usage:
+  python benchmarks.py --scales 1000 10000 --output bench.json
+  python benchmarks.py --scales 10000 --compare bench.json   # exit 1 on regression
+
+Each one-off operation is timed ``--repeat`` times and the fastest run is
+kept; operations too fast for the clock are looped until they run long enough
+to measure. ``--compare`` ignores changes smaller than ``--min-delta-ms`` and
+refuses to compare runs made with different parameters.
+
+Scales of 10^6-10^7 documents are supported, but the search indexes and the
+trainer hold the whole corpus in memory, so size the machine accordingly.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # not available on Windows; peak RSS is then reported as None
+    resource = None
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SALARY_MODEL_PATH = os.path.join(ROOT, "salary-predictor(ML)", "model.py")
+
+SEARCH_CLASSES = [
+    "CosineSimilaritySearch",
+    "EuclideanDistanceSearch",
+    "ManhattanDistanceSearch",
+    "JaccardSimilaritySearch",
+    "BM25Search",
+]
+
+
+# =============================================================================
+# SYNTHETIC DATA
+# =============================================================================
+
+_SYLLABLES = [c + v for c in "bdfgklmnprstvz" for v in "aeiou"]
+
+
+def pseudo_word(rank: int) -> str:
+    """Deterministic pseudo-word for a 0-based frequency rank.
+
+    The rank is written in base len(_SYLLABLES), one syllable per digit, so
+    words are unique and their length grows with log(rank).
+    """
+    rank += 1
+    parts = []
+    while rank:
+        rank, digit = divmod(rank - 1, len(_SYLLABLES))
+        parts.append(_SYLLABLES[digit])
+    return "".join(reversed(parts))
+
+
+def zipf_cdf(vocab_size: int, exponent: float) -> np.ndarray:
+    weights = 1.0 / np.arange(1, vocab_size + 1, dtype=np.float64) ** exponent
+    cdf = np.cumsum(weights)
+    return cdf / cdf[-1]
+
+
+def iter_zipf_documents(n_docs: int, vocab_size: int = 50_000, exponent: float = 1.1,
+                        mean_length: int = 20, seed: int = 0,
+                        chunk_size: int = 10_000) -> Iterator[str]:
+    """Yield ``n_docs`` documents whose words follow a Zipf law over the vocabulary."""
+    rng = np.random.default_rng(seed)
+    vocab = np.array([pseudo_word(r) for r in range(vocab_size)], dtype=object)
+    cdf = zipf_cdf(vocab_size, exponent)
+    for start in range(0, n_docs, chunk_size):
+        count = min(chunk_size, n_docs - start)
+        lengths = np.maximum(rng.poisson(mean_length, count), 1)
+        words = vocab[np.searchsorted(cdf, rng.random(int(lengths.sum())), side="right")]
+        bounds = np.concatenate(([0], np.cumsum(lengths)))
+        for i in range(count):
+            yield " ".join(words[bounds[i]:bounds[i + 1]])
+
+
+def zipf_corpus(n_docs: int, **kwargs) -> List[str]:
+    return list(iter_zipf_documents(n_docs, **kwargs))
+
+
+def zipf_queries(n_queries: int, vocab_size: int = 50_000, exponent: float = 1.1,
+                 seed: int = 1) -> List[str]:
+    """Short queries (1-6 terms) drawn from the same distribution as the corpus."""
+    return list(iter_zipf_documents(n_queries, vocab_size, exponent, mean_length=3, seed=seed))
+
+
+def salary_dataset(n_rows: int, seed: int = 0, exponent: float = 1.1):
+    """Salary rows with Zipf-skewed job roles and education levels, as a DataFrame."""
+    import pandas as pd
+
+    model = _load_salary_model()
+    rng = np.random.default_rng(seed)
+
+    def skewed(categories):
+        cdf = zipf_cdf(len(categories), exponent)
+        return np.array(categories)[np.searchsorted(cdf, rng.random(n_rows), side="right")]
+
+    experience = rng.integers(0, 20, n_rows)
+    education = skewed(model.edu_levels)
+    job_role = skewed(model.job_roles)
+    salary = (
+        np.vectorize(model.role_bonus.get)(job_role)
+        + np.vectorize(model.edu_bonus.get)(education)
+        + experience * 3000
+        + rng.normal(0, 5000, n_rows)
+    ).astype(int)
+    return pd.DataFrame({
+        "experience_years": experience,
+        "education": education,
+        "job_role": job_role,
+        "salary": salary,
+    })
+
+
+# =============================================================================
+# MEASUREMENT HELPERS
+# =============================================================================
+
+def _load_salary_model():
+    # The project directory name is not a valid package name, so load by path.
+    if "salary_model" not in sys.modules:
+        spec = importlib.util.spec_from_file_location("salary_model", SALARY_MODEL_PATH)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules["salary_model"] = module
+        spec.loader.exec_module(module)
+    return sys.modules["salary_model"]
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far, in MiB."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile, as in search_algorithms."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+
+def timed(fn: Callable, *args, repeat: int = 1, **kwargs):
+    """Return ``(result, seconds)``: the last result and the fastest of ``repeat`` calls."""
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def per_call(fn: Callable, repeat: int) -> float:
+    """Seconds per call of a fast operation, best of ``repeat`` timeit loops.
+
+    Each loop runs ``fn`` enough times to last at least 0.2 s, so calls of a
+    few microseconds are measured well above the clock resolution.
+    """
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def latency_stats(fn: Callable, inputs: Sequence, repeat: int = 1) -> Dict[str, float]:
+    """Call ``fn`` on each input and summarise per-call latency in milliseconds.
+
+    With ``repeat`` > 1 the inputs are run that many times and each input
+    keeps its fastest call, which filters out scheduler noise.
+    """
+    samples = [math.inf] * len(inputs)
+    for _ in range(repeat):
+        for i, item in enumerate(inputs):
+            start = time.perf_counter()
+            fn(item)
+            samples[i] = min(samples[i], (time.perf_counter() - start) * 1000)
+    return {
+        "p50_ms": _percentile(samples, 50),
+        "p99_ms": _percentile(samples, 99),
+        "mean_ms": sum(samples) / len(samples),
+    }
+
+
+# =============================================================================
+# CASES
+# =============================================================================
+# Every case takes the run parameters and returns a flat dict of metrics.
+# Names ending in _s/_ms/_mb are lower-is-better, _per_s higher-is-better.
+
+def bench_wordpiece(params: dict) -> dict:
+    from wordpiece_tokenizer import WordPieceTrainer
+
+    corpus = zipf_corpus(params["scale"], vocab_size=params["vocab_size"],
+                         exponent=params["exponent"], seed=params["seed"])
+    corpus_rss = peak_rss_mb()
+    repeat = params["repeat"]
+    tokenizer, train_s = timed(WordPieceTrainer(vocab_size=params["wp_vocab_size"]).train, corpus,
+                               repeat=repeat)
+
+    sample = corpus[:params["encode_docs"]]
+    latency = latency_stats(tokenizer.encode, sample, repeat)
+
+    def encode_cold():
+        tokenizer.clear_cache()
+        return [tokenizer.encode(doc) for doc in sample]
+
+    ids, batch_s = timed(encode_cold, repeat=repeat)
+    n_tokens = sum(len(x) for x in ids)
+    return {
+        "train_s": train_s,
+        "vocab_size": tokenizer.vocab_size(),
+        "encode_p50_ms": latency["p50_ms"],
+        "encode_p99_ms": latency["p99_ms"],
+        "encode_docs_per_s": len(sample) / batch_s,
+        "encode_tokens_per_s": n_tokens / batch_s,
+        "corpus_rss_mb": corpus_rss,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def bench_search(params: dict, class_name: str) -> dict:
+    import search_algorithms
+
+    corpus = zipf_corpus(params["scale"], vocab_size=params["vocab_size"],
+                         exponent=params["exponent"], seed=params["seed"])
+    queries = zipf_queries(params["queries"], params["vocab_size"], params["exponent"],
+                           seed=params["seed"] + 1)
+    corpus_rss = peak_rss_mb()
+
+    repeat = params["repeat"]
+    cls = getattr(search_algorithms, class_name)
+    index, index_s = timed(search_algorithms.CorpusIndex, corpus, repeat=repeat)
+    build_s = per_call(lambda: cls(index), repeat)
+
+    def first_query():
+        # Some per-class state is built lazily on the first query; report it apart.
+        search = cls(index)
+        search.search(queries[0], params["top_k"])
+        return search
+
+    search, first_query_s = timed(first_query, repeat=repeat)
+    latency = latency_stats(lambda q: search.search(q, params["top_k"]), queries, repeat)
+    return {
+        "index_build_s": index_s,
+        "search_build_s": build_s,
+        "first_query_ms": first_query_s * 1000,
+        "query_p50_ms": latency["p50_ms"],
+        "query_p99_ms": latency["p99_ms"],
+        "queries_per_s": 1000 / latency["mean_ms"],
+        "corpus_rss_mb": corpus_rss,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def bench_salary(params: dict) -> dict:
+    model = _load_salary_model()
+    df = salary_dataset(params["scale"], seed=params["seed"], exponent=params["exponent"])
+
+    def fit_sklearn(frame):
+        X_train, _, y_train, _, le_edu, le_role = model.preprocess(frame)
+        lr, _ = model.train(X_train, y_train)
+        return model.SalaryModel.from_estimator(lr, le_edu, le_role)
+
+    repeat = params["repeat"]
+    fit_sklearn(df.head(100))  # pay the deferred sklearn imports outside the timing
+    fitted, fit_sklearn_s = timed(fit_sklearn, df, repeat=repeat)
+    chunk = params["chunk_size"]
+    chunks = [df.iloc[i:i + chunk] for i in range(0, len(df), chunk)]
+    _, fit_stream_s = timed(model.train_stream, chunks, repeat=repeat)
+
+    encoded = np.column_stack([
+        df["experience_years"].to_numpy(),
+        np.searchsorted(fitted.education, df["education"].to_numpy()),
+        np.searchsorted(fitted.job_role, df["job_role"].to_numpy()),
+    ])
+    cv, cv_s = timed(model.cross_validate_alphas, encoded, df["salary"].to_numpy(), n_workers=1,
+                     repeat=repeat)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "salary_model.json")
+        fitted.save(path)
+        loaded = model.SalaryModel.load(path)
+        load_s = per_call(lambda: model.SalaryModel.load(path), repeat)
+
+    rows = [(int(e), ed, r) for e, ed, r in
+            df[["experience_years", "education", "job_role"]].head(1000).itertuples(index=False)]
+    single = latency_stats(lambda row: loaded.predict(*row), rows, repeat)
+
+    columns = {name: df[name].to_numpy() for name in ("experience_years", "education", "job_role")}
+    codes = {"experience_years": encoded[:, 0], "education": encoded[:, 1], "job_role": encoded[:, 2]}
+    out = np.empty(len(df))
+    names_s = per_call(lambda: loaded.predict_many(columns, out), repeat)
+    codes_s = per_call(lambda: loaded.predict_many(codes, out), repeat)
+    return {
+        "fit_sklearn_s": fit_sklearn_s,
+        "fit_stream_s": fit_stream_s,
+        "cv_sweep_s": cv_s,
+        "cv_best_alpha": cv["best_alpha"],
+        "artifact_load_ms": load_s * 1000,
+        "predict_p50_ms": single["p50_ms"],
+        "predict_p99_ms": single["p99_ms"],
+        "predict_many_names_rows_per_s": len(df) / names_s,
+        "predict_many_codes_rows_per_s": len(df) / codes_s,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def _cases(suites: Sequence[str]) -> List[str]:
+    cases = []
+    if "tokenizer" in suites:
+        cases.append("wordpiece")
+    if "search" in suites:
+        cases.extend("search." + name for name in SEARCH_CLASSES)
+    if "salary" in suites:
+        cases.append("salary")
+    return cases
+
+
+def run_case(case: str, params: dict) -> dict:
+    if case == "wordpiece":
+        return bench_wordpiece(params)
+    if case == "salary":
+        return bench_salary(params)
+    if case.startswith("search."):
+        return bench_search(params, case.split(".", 1)[1])
+    raise ValueError(f"unknown benchmark case: {case!r}")
+
+
+def _run_isolated(case: str, params: dict) -> dict:
+    # A fresh interpreter per case keeps peak RSS and caches independent.
+    with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(run_case, case, params).result()
+
+
+# =============================================================================
+# REPORTING
+# =============================================================================
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> dict:
+    return {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "cpu_count": os.cpu_count(),
+    }
+
+
+# Absolute changes below these are noise whatever their relative size.
+MIN_DELTA_MB = 1.0
+
+
+def _params_mismatch(current: dict, baseline: dict) -> List[str]:
+    """Describe parameters that differ between two runs at the scales both cover."""
+    diffs = []
+    old_params = baseline.get("params", {})
+    for scale, params in current["params"].items():
+        if scale not in old_params:
+            continue
+        for key in sorted(set(params) | set(old_params[scale])):
+            if params.get(key) != old_params[scale].get(key):
+                diffs.append(f"{scale}/{key}: {old_params[scale].get(key)!r} -> {params.get(key)!r}")
+    return diffs
+
+
+def compare(current: dict, baseline: dict, threshold: float,
+            min_delta_ms: float = 1.0) -> List[str]:
+    """List metrics that got worse than ``baseline`` by more than ``threshold``.
+
+    Timings must also grow by more than ``min_delta_ms`` (and memory by
+    ``MIN_DELTA_MB``) to count; throughputs are already measured over loops
+    of at least 0.2 s. Raises ``ValueError`` if the two runs were made with
+    different parameters.
+    """
+    diffs = _params_mismatch(current, baseline)
+    if diffs:
+        raise ValueError("runs used different parameters: " + "; ".join(diffs))
+    regressions = []
+    for scale, cases in current["results"].items():
+        for case, metrics in cases.items():
+            old = baseline.get("results", {}).get(scale, {}).get(case, {})
+            for name, value in metrics.items():
+                before = old.get(name)
+                if not isinstance(value, (int, float)) or not isinstance(before, (int, float)) or not before:
+                    continue
+                if name.endswith("_per_s"):
+                    change = before / value - 1 if value else float("inf")
+                elif name.endswith(("_s", "_ms")):
+                    delta_ms = (value - before) * (1000 if name.endswith("_s") else 1)
+                    change = value / before - 1 if delta_ms > min_delta_ms else 0.0
+                elif name.endswith("_mb"):
+                    change = value / before - 1 if value - before > MIN_DELTA_MB else 0.0
+                else:
+                    continue
+                if change > threshold:
+                    regressions.append(f"{scale}/{case}/{name}: {before:.4g} -> {value:.4g} "
+                                       f"({change:+.0%} worse)")
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1000, 10_000],
+                        help="corpus sizes in documents (salary: rows)")
+    parser.add_argument("--suites", nargs="+", default=["tokenizer", "search", "salary"],
+                        choices=["tokenizer", "search", "salary"])
+    parser.add_argument("--vocab-size", type=int, default=50_000, help="Zipf vocabulary size")
+    parser.add_argument("--exponent", type=float, default=1.1, help="Zipf exponent")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--queries", type=int, default=200, help="queries per search class")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--wp-vocab-size", type=int, default=1000, help="WordPiece target vocab")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs per timing; the fastest is reported")
+    parser.add_argument("--encode-docs", type=int, default=2000, help="documents to encode")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="salary streaming chunk")
+    parser.add_argument("--no-isolate", action="store_true",
+                        help="run cases in this process (faster; peak RSS becomes cumulative)")
+    parser.add_argument("--output", default="-", help="JSON output path ('-' for stdout)")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="relative slowdown reported as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0,
+                        help="ignore timing changes smaller than this")
+    args = parser.parse_args(argv)
+
+    report = {"environment": environment(), "params": {}, "results": {}}
+    for scale in args.scales:
+        params = {
+            "scale": scale,
+            "vocab_size": args.vocab_size,
+            "exponent": args.exponent,
+            "seed": args.seed,
+            "queries": args.queries,
+            "top_k": args.top_k,
+            "wp_vocab_size": args.wp_vocab_size,
+            "encode_docs": min(args.encode_docs, scale),
+            "chunk_size": args.chunk_size,
+            "repeat": args.repeat,
+        }
+        report["params"][str(scale)] = params
+        results = report["results"][str(scale)] = {}
+        for case in _cases(args.suites):
+            print(f"[{scale}] {case} ...", file=sys.stderr, flush=True)
+            results[case] = run_case(case, params) if args.no_isolate else _run_isolated(case, params)
+
+    text = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        try:
+            regressions = compare(report, baseline, args.threshold, args.min_delta_ms)
+        except ValueError as exc:
+            print(f"cannot compare with {args.compare}: {exc}", file=sys.stderr)
+            return 2
+        for line in regressions:
+            print("REGRESSION " + line, file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
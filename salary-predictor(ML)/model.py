@@ -1,88 +1,116 @@
 """
 💼 Salary Predictor — Linear Regression Model
 Predicts salary based on years of experience, education level, and job role.
+
+Importing this module only loads NumPy. pandas, scikit-learn and matplotlib
+are imported inside the stages that need them, so a service can do
+
+    from model import SalaryModel
+    model = SalaryModel.load()
+    model.predict(5, "Master's", "Software Engineer")
+
+without paying for training or plotting. Run the file as a script for the
+full generate → train → evaluate → plot → predict walkthrough.
 """
 
+import json
+import numbers
+import os
+import time
+
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.ticker as mticker
-from sklearn.linear_model import LinearRegression, Ridge
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-import warnings
-warnings.filterwarnings("ignore")
 
 # ─────────────────────────────────────────────────────────────
-# 1. GENERATE SYNTHETIC DATASET
+# CONFIGURATION
 # ─────────────────────────────────────────────────────────────
-np.random.seed(42)
-n = 300
-
 job_roles   = ["Data Analyst", "Software Engineer", "ML Engineer", "Product Manager", "DevOps"]
 edu_levels  = ["Bachelor's", "Master's", "PhD"]
 
-experience  = np.random.randint(0, 20, n)
-education   = np.random.choice(edu_levels, n)
-job_role    = np.random.choice(job_roles,  n)
-
 edu_bonus   = {"Bachelor's": 0, "Master's": 8000, "PhD": 18000}
 role_bonus  = {
     "Data Analyst": 55000, "Software Engineer": 75000,
     "ML Engineer": 90000,  "Product Manager": 80000, "DevOps": 70000
 }
 
-salary = (
-    np.array([role_bonus[r] for r in job_role])
-    + np.array([edu_bonus[e] for e in education])
-    + experience * 3000
-    + np.random.normal(0, 5000, n)
-).astype(int)
+FEATURES      = ["experience_years", "education", "job_role"]
+ARTIFACT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "salary_model.json")
+
+
+# ─────────────────────────────────────────────────────────────
+# 1. GENERATE SYNTHETIC DATASET
+# ─────────────────────────────────────────────────────────────
+def generate_data(n=300, seed=42):
+    """Return a synthetic DataFrame of ``n`` employees and their salaries."""
+    import pandas as pd
+
+    np.random.seed(seed)
+
+    experience  = np.random.randint(0, 20, n)
+    education   = np.random.choice(edu_levels, n)
+    job_role    = np.random.choice(job_roles,  n)
 
-df = pd.DataFrame({
-    "experience_years": experience,
-    "education":        education,
-    "job_role":         job_role,
-    "salary":           salary
-})
+    salary = (
+        np.array([role_bonus[r] for r in job_role])
+        + np.array([edu_bonus[e] for e in education])
+        + experience * 3000
+        + np.random.normal(0, 5000, n)
+    ).astype(int)
+
+    return pd.DataFrame({
+        "experience_years": experience,
+        "education":        education,
+        "job_role":         job_role,
+        "salary":           salary
+    })
 
-print("📊 Dataset Sample:")
-print(df.head(10).to_string(index=False))
-print(f"\nShape: {df.shape}")
-print(f"Salary range: ${df['salary'].min():,} — ${df['salary'].max():,}")
 
 # ─────────────────────────────────────────────────────────────
 # 2. PREPROCESSING
 # ─────────────────────────────────────────────────────────────
-df_encoded = df.copy()
-le_edu  = LabelEncoder()
-le_role = LabelEncoder()
-df_encoded["education"] = le_edu.fit_transform(df["education"])
-df_encoded["job_role"]  = le_role.fit_transform(df["job_role"])
+def preprocess(df, test_size=0.2, random_state=42):
+    """Label-encode the categorical columns and split into train/test sets.
+
+    Returns ``(X_train, X_test, y_train, y_test, le_edu, le_role)``.
+    """
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import LabelEncoder
+
+    df_encoded = df.copy()
+    le_edu  = LabelEncoder()
+    le_role = LabelEncoder()
+    df_encoded["education"] = le_edu.fit_transform(df["education"])
+    df_encoded["job_role"]  = le_role.fit_transform(df["job_role"])
+
+    X = df_encoded[FEATURES]
+    y = df_encoded["salary"]
 
-X = df_encoded[["experience_years", "education", "job_role"]]
-y = df_encoded["salary"]
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=test_size, random_state=random_state)
+    return X_train, X_test, y_train, y_test, le_edu, le_role
 
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-print(f"\n✅ Train size: {len(X_train)} | Test size: {len(X_test)}")
 
 # ─────────────────────────────────────────────────────────────
 # 3. TRAIN MODELS
 # ─────────────────────────────────────────────────────────────
-lr  = LinearRegression()
-rid = Ridge(alpha=1.0)
+def train(X_train, y_train, alpha=1.0):
+    """Fit ``LinearRegression`` and ``Ridge(alpha)``; return ``(lr, rid)``."""
+    from sklearn.linear_model import LinearRegression, Ridge
 
-lr.fit(X_train, y_train)
-rid.fit(X_train, y_train)
+    lr  = LinearRegression()
+    rid = Ridge(alpha=alpha)
+
+    lr.fit(X_train, y_train)
+    rid.fit(X_train, y_train)
+    return lr, rid
 
-y_pred_lr  = lr.predict(X_test)
-y_pred_rid = rid.predict(X_test)
 
 # ─────────────────────────────────────────────────────────────
 # 4. EVALUATE
 # ─────────────────────────────────────────────────────────────
 def evaluate(name, y_true, y_pred):
+    """Print MAE / RMSE / R² for one model and return its R²."""
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
     mae  = mean_absolute_error(y_true, y_pred)
     rmse = np.sqrt(mean_squared_error(y_true, y_pred))
     r2   = r2_score(y_true, y_pred)
@@ -92,85 +120,584 @@ def evaluate(name, y_true, y_pred):
     print(f"   R²   : {r2:.4f}")
     return r2
 
-print("\n" + "="*45)
-print("          MODEL EVALUATION RESULTS")
-print("="*45)
-r2_lr  = evaluate("Linear Regression", y_test, y_pred_lr)
-r2_rid = evaluate("Ridge Regression",  y_test, y_pred_rid)
-
-winner = "Linear Regression" if r2_lr > r2_rid else "Ridge Regression"
-print(f"\n🏆 Best Model: {winner}")
 
 # ─────────────────────────────────────────────────────────────
 # 5. VISUALIZATIONS
 # ─────────────────────────────────────────────────────────────
-fig, axes = plt.subplots(1, 3, figsize=(18, 5))
-fig.suptitle("💼 Salary Predictor — Model Insights", fontsize=15, fontweight="bold", y=1.02)
-
-# --- Plot 1: Actual vs Predicted ---
-ax = axes[0]
-ax.scatter(y_test, y_pred_lr, alpha=0.6, color="#4C72B0", edgecolors="white", linewidth=0.5, label="Predicted")
-mn, mx = y_test.min(), y_test.max()
-ax.plot([mn, mx], [mn, mx], "r--", linewidth=2, label="Perfect Prediction")
-ax.set_title("Actual vs Predicted Salary", fontweight="bold")
-ax.set_xlabel("Actual Salary ($)")
-ax.set_ylabel("Predicted Salary ($)")
-ax.xaxis.set_major_formatter(mticker.FuncFormatter(lambda x, _: f"${x/1000:.0f}K"))
-ax.yaxis.set_major_formatter(mticker.FuncFormatter(lambda x, _: f"${x/1000:.0f}K"))
-ax.legend()
-ax.grid(True, alpha=0.3)
-
-# --- Plot 2: Average Salary by Role (clean bar chart) ---
-ax = axes[1]
-avg_by_role = df.groupby("job_role")["salary"].mean().sort_values(ascending=True)
-colors_role = ["#4C72B0", "#DD8452", "#55A868", "#C44E52", "#8172B2"]
-bars2 = ax.barh(avg_by_role.index, avg_by_role.values, color=colors_role, edgecolor="white", linewidth=1.2)
-ax.set_title("Avg Salary by Job Role", fontweight="bold")
-ax.set_xlabel("Average Salary ($)")
-ax.xaxis.set_major_formatter(mticker.FuncFormatter(lambda x, _: f"${x/1000:.0f}K"))
-for bar, val in zip(bars2, avg_by_role.values):
-    ax.text(bar.get_width() + 500, bar.get_y() + bar.get_height()/2,
-            f"${val/1000:.1f}K", va="center", fontsize=9, fontweight="bold")
-ax.grid(True, alpha=0.3, axis="x")
-ax.set_xlim(0, avg_by_role.max() * 1.18)
-
-# --- Plot 3: Average Salary by Education ---
-ax = axes[2]
-avg_by_edu = df.groupby("education")["salary"].mean().sort_values()
-bars = ax.bar(avg_by_edu.index, avg_by_edu.values,
-              color=["#4C72B0", "#DD8452", "#55A868"], edgecolor="white", linewidth=1.2)
-ax.set_title("Avg Salary by Education Level", fontweight="bold")
-ax.set_xlabel("Education Level")
-ax.set_ylabel("Average Salary ($)")
-ax.yaxis.set_major_formatter(mticker.FuncFormatter(lambda x, _: f"${x/1000:.0f}K"))
-for bar, val in zip(bars, avg_by_edu.values):
-    ax.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 500,
-            f"${val/1000:.1f}K", ha="center", va="bottom", fontsize=9, fontweight="bold")
-ax.grid(True, alpha=0.3, axis="y")
-
-plt.tight_layout()
-plt.savefig("results.png", dpi=150, bbox_inches="tight")
-plt.show()
-print("\n📊 Plot saved as results.png")
-
-# ─────────────────────────────────────────────────────────────
-# 6. PREDICT ON NEW INPUT
-# ─────────────────────────────────────────────────────────────
-print("\n" + "="*45)
-print("        SAMPLE PREDICTIONS")
-print("="*45)
-
-samples = pd.DataFrame([
-    {"experience_years": 2,  "education": "Bachelor's", "job_role": "Data Analyst"},
-    {"experience_years": 5,  "education": "Master's",   "job_role": "Software Engineer"},
-    {"experience_years": 10, "education": "PhD",        "job_role": "ML Engineer"},
-])
-
-samples_enc = samples.copy()
-samples_enc["education"] = le_edu.transform(samples["education"])
-samples_enc["job_role"]  = le_role.transform(samples["job_role"])
-
-preds = lr.predict(samples_enc)
-for i, (_, row) in enumerate(samples.iterrows()):
-    print(f"\n  👤 {row['job_role']} | {row['education']} | {row['experience_years']} yrs exp")
-    print(f"     Predicted Salary: ${preds[i]:,.0f}")
\ No newline at end of file
+def plot_results(df, y_test, y_pred, path="results.png", show=True):
+    """Render the three insight plots and save them to ``path``."""
+    import matplotlib.pyplot as plt
+    import matplotlib.ticker as mticker
+
+    fig, axes = plt.subplots(1, 3, figsize=(18, 5))
+    fig.suptitle("💼 Salary Predictor — Model Insights", fontsize=15, fontweight="bold", y=1.02)
+
+    # --- Plot 1: Actual vs Predicted ---
+    ax = axes[0]
+    ax.scatter(y_test, y_pred, alpha=0.6, color="#4C72B0", edgecolors="white", linewidth=0.5, label="Predicted")
+    mn, mx = y_test.min(), y_test.max()
+    ax.plot([mn, mx], [mn, mx], "r--", linewidth=2, label="Perfect Prediction")
+    ax.set_title("Actual vs Predicted Salary", fontweight="bold")
+    ax.set_xlabel("Actual Salary ($)")
+    ax.set_ylabel("Predicted Salary ($)")
+    ax.xaxis.set_major_formatter(mticker.FuncFormatter(lambda x, _: f"${x/1000:.0f}K"))
+    ax.yaxis.set_major_formatter(mticker.FuncFormatter(lambda x, _: f"${x/1000:.0f}K"))
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+
+    # --- Plot 2: Average Salary by Role (clean bar chart) ---
+    ax = axes[1]
+    avg_by_role = df.groupby("job_role")["salary"].mean().sort_values(ascending=True)
+    colors_role = ["#4C72B0", "#DD8452", "#55A868", "#C44E52", "#8172B2"]
+    bars2 = ax.barh(avg_by_role.index, avg_by_role.values, color=colors_role, edgecolor="white", linewidth=1.2)
+    ax.set_title("Avg Salary by Job Role", fontweight="bold")
+    ax.set_xlabel("Average Salary ($)")
+    ax.xaxis.set_major_formatter(mticker.FuncFormatter(lambda x, _: f"${x/1000:.0f}K"))
+    for bar, val in zip(bars2, avg_by_role.values):
+        ax.text(bar.get_width() + 500, bar.get_y() + bar.get_height()/2,
+                f"${val/1000:.1f}K", va="center", fontsize=9, fontweight="bold")
+    ax.grid(True, alpha=0.3, axis="x")
+    ax.set_xlim(0, avg_by_role.max() * 1.18)
+
+    # --- Plot 3: Average Salary by Education ---
+    ax = axes[2]
+    avg_by_edu = df.groupby("education")["salary"].mean().sort_values()
+    bars = ax.bar(avg_by_edu.index, avg_by_edu.values,
+                  color=["#4C72B0", "#DD8452", "#55A868"], edgecolor="white", linewidth=1.2)
+    ax.set_title("Avg Salary by Education Level", fontweight="bold")
+    ax.set_xlabel("Education Level")
+    ax.set_ylabel("Average Salary ($)")
+    ax.yaxis.set_major_formatter(mticker.FuncFormatter(lambda x, _: f"${x/1000:.0f}K"))
+    for bar, val in zip(bars, avg_by_edu.values):
+        ax.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 500,
+                f"${val/1000:.1f}K", ha="center", va="bottom", fontsize=9, fontweight="bold")
+    ax.grid(True, alpha=0.3, axis="y")
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=150, bbox_inches="tight")
+    if show:
+        plt.show()
+    plt.close(fig)
+
+
+# ─────────────────────────────────────────────────────────────
+# 6. PERSISTED MODEL + INFERENCE
+# ─────────────────────────────────────────────────────────────
+UNKNOWN_MODES = ("error", "nan", "mean")
+
+
+class SalaryModel:
+    """A fitted linear salary model reduced to plain NumPy arrays.
+
+    Holds the coefficients and intercept in ``FEATURES`` order plus the
+    category → code mappings of ``le_edu`` and ``le_role``. Saved as a small
+    JSON file, so loading needs neither pandas nor scikit-learn.
+
+    Because the categorical features enter the model linearly through their
+    codes, each one is precomputed into a lookup table of per-category
+    contributions (with the intercept folded into the education table).
+    ``predict_many`` is then one multiply and two gathers per batch.
+    """
+
+    def __init__(self, coef, intercept, education, job_role):
+        self.coef       = np.asarray(coef, dtype=np.float64)
+        self.intercept  = float(intercept)
+        self.education  = list(education)
+        self.job_role   = list(job_role)
+        self.edu_codes  = {c: i for i, c in enumerate(self.education)}
+        self.role_codes = {c: i for i, c in enumerate(self.job_role)}
+        self._columns = [
+            self._column(self.education, self.coef[1] * np.arange(len(self.education)) + self.intercept),
+            self._column(self.job_role,  self.coef[2] * np.arange(len(self.job_role))),
+        ]
+
+    @staticmethod
+    def _column(classes, contrib):
+        # One spare slot at the end of each table receives unknown categories.
+        # It holds NaN; the "mean" policy substitutes a copy per call.
+        order = np.argsort(np.array(classes, dtype=str), kind="stable")
+        return {
+            "codes":   {c: i for i, c in enumerate(classes)},
+            "sorted":  np.array(classes, dtype=str)[order],
+            "order":   order.astype(np.intp),
+            "table":   np.append(contrib, np.nan),
+        }
+
+    @classmethod
+    def from_estimator(cls, estimator, le_edu, le_role):
+        """Capture a fitted sklearn linear model and its label encoders."""
+        return cls(estimator.coef_, estimator.intercept_,
+                   [str(c) for c in le_edu.classes_],
+                   [str(c) for c in le_role.classes_])
+
+    def save(self, path=ARTIFACT_PATH):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "features":  FEATURES,
+                "coef":      self.coef.tolist(),
+                "intercept": self.intercept,
+                "education": self.education,
+                "job_role":  self.job_role,
+            }, f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def load(cls, path=ARTIFACT_PATH):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("features", FEATURES) != FEATURES:
+            raise ValueError(f"artifact features {data['features']} do not match {FEATURES}")
+        return cls(data["coef"], data["intercept"], data["education"], data["job_role"])
+
+    def predict(self, experience_years, education, job_role, unknown="error"):
+        """Predict salaries for scalars or equal-length sequences."""
+        scalar = np.ndim(experience_years) == 0 and np.ndim(education) == 0
+        if np.ndim(education) == 0:
+            education = [education]
+        if np.ndim(job_role) == 0:
+            job_role = [job_role]
+        preds = self.predict_many({
+            "experience_years": np.atleast_1d(experience_years),
+            "education":        education,
+            "job_role":         job_role,
+        }, unknown=unknown)
+        return float(preds[0]) if scalar else preds
+
+    def predict_many(self, batch, out=None, unknown="error"):
+        """Predict a whole batch with vectorized lookups.
+
+        ``batch`` is either columnar — a mapping (dict, DataFrame) or a
+        structured array with the ``FEATURES`` fields — or a sequence of
+        records given as dicts or as tuples in ``FEATURES`` order.
+        Categorical columns may hold category names or integer codes that
+        are already encoded, as arrays or plain sequences; a column mixing
+        the two raises ``TypeError``.
+
+        ``out`` is an optional preallocated float64 buffer of the batch
+        length, so a serving loop can reuse one buffer.
+
+        ``unknown`` controls categories the model was not trained on:
+        ``"error"`` raises ``KeyError``, ``"nan"`` predicts NaN for the row,
+        and ``"mean"`` substitutes the average contribution of the known
+        categories.
+        """
+        if unknown not in UNKNOWN_MODES:
+            raise ValueError(f"unknown must be one of {UNKNOWN_MODES}, got {unknown!r}")
+        experience, education, job_role = self._split_batch(batch)
+
+        experience = np.asarray(experience, dtype=np.float64)
+        n = experience.shape[0]
+        if out is None:
+            out = np.empty(n, dtype=np.float64)
+        elif out.shape != (n,) or out.dtype != np.float64:
+            raise ValueError(f"out must be a float64 array of shape ({n},)")
+
+        np.multiply(experience, self.coef[0], out=out)
+        for name, values, column in zip(FEATURES[1:], (education, job_role), self._columns):
+            codes = self._encode(values, column)
+            if len(codes) != n:
+                raise ValueError(f"column {name!r} has {len(codes)} rows, expected {n}")
+            table = column["table"]
+            size = len(table) - 1
+            if unknown == "error":
+                if n and codes.max() == size:
+                    bad = list(values)[int(np.argmax(codes == size))]
+                    raise KeyError(f"unknown {name} category: {bad!r}")
+            elif unknown == "mean":
+                table = table.copy()
+                table[size] = table[:size].mean()
+            out += table[codes]
+        return out
+
+    @staticmethod
+    def _split_batch(batch):
+        if isinstance(batch, np.ndarray) and batch.dtype.names:
+            return tuple(batch[f] for f in FEATURES)
+        if hasattr(batch, "keys"):
+            return tuple(batch[f] for f in FEATURES)
+        records = list(batch)
+        if records and isinstance(records[0], dict):
+            return tuple([r[f] for r in records] for f in FEATURES)
+        if not records:
+            return ((), (), ())
+        return tuple(list(col) for col in zip(*records))
+
+    @staticmethod
+    def _encode(values, column):
+        """Map one categorical column to table indices (unknown → last slot)."""
+        size = len(column["table"]) - 1
+        if hasattr(values, "to_numpy"):
+            values = values.to_numpy()
+        if not isinstance(values, np.ndarray) or values.dtype.kind == "O":
+            # Sort plain sequences by element type: np.asarray would stringify
+            # a mix of 1 and "PhD" instead of rejecting it.
+            types = set(map(type, values))
+            is_code = [issubclass(t, numbers.Integral) and t is not bool for t in types]
+            if is_code and all(is_code):
+                values = np.asarray(values, dtype=np.int64)
+            elif any(is_code):
+                raise TypeError("categorical column mixes integer codes and category names")
+        if isinstance(values, np.ndarray) and values.dtype.kind in "iu":
+            codes = values.astype(np.intp, copy=False)
+            if codes.size and (codes.min() < 0 or codes.max() >= size):
+                codes = np.where((codes >= 0) & (codes < size), codes, size)
+            return codes
+        if isinstance(values, np.ndarray) and values.dtype.kind in "US":
+            # Binary search against the sorted class names: O(n log k) in C.
+            values = values.astype(str, copy=False)
+            pos = np.minimum(np.searchsorted(column["sorted"], values), size - 1)
+            found = column["sorted"][pos] == values
+            return np.where(found, column["order"][pos], size)
+        codes = column["codes"]
+        return np.fromiter((codes.get(v, size) for v in values), dtype=np.intp,
+                           count=len(values))
+
+
+# ─────────────────────────────────────────────────────────────
+# 7. STREAMING TRAINING (DATA LARGER THAN MEMORY)
+# ─────────────────────────────────────────────────────────────
+TARGET = "salary"
+
+
+class SufficientStats:
+    """Mergeable least-squares statistics: count, means, centred XᵀX and Xᵀy.
+
+    Each chunk is centred on its own mean and combined with the running
+    totals by the pairwise (Chan et al.) update. That stays accurate for
+    salary-sized values where raw sums of squares would cancel badly.
+    Solving with the intercept unpenalised reproduces sklearn's
+    ``LinearRegression`` (``alpha=0``) and ``Ridge(alpha)``.
+    """
+
+    def __init__(self, n_features=len(FEATURES)):
+        self.n      = 0
+        self.x_mean = np.zeros(n_features)
+        self.y_mean = 0.0
+        self.xx     = np.zeros((n_features, n_features))
+        self.xy     = np.zeros(n_features)
+        self.yy     = 0.0
+
+    def update(self, X, y):
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if not len(y):
+            return self
+        x_mean, y_mean = X.mean(axis=0), y.mean()
+        Xc, yc = X - x_mean, y - y_mean
+        self._combine(len(y), x_mean, y_mean, Xc.T @ Xc, Xc.T @ yc, yc @ yc)
+        return self
+
+    def merge(self, other):
+        if other.n:
+            self._combine(other.n, other.x_mean, other.y_mean, other.xx, other.xy, other.yy)
+        return self
+
+    def _combine(self, m, x_mean, y_mean, xx, xy, yy):
+        total = self.n + m
+        dx, dy = x_mean - self.x_mean, y_mean - self.y_mean
+        w = self.n * m / total
+        self.xx     = self.xx + xx + w * np.outer(dx, dx)
+        self.xy     = self.xy + xy + w * dx * dy
+        self.yy     = self.yy + yy + w * dy * dy
+        self.x_mean = self.x_mean + dx * (m / total)
+        self.y_mean = self.y_mean + dy * (m / total)
+        self.n      = total
+
+    def solve(self, alpha=0.0):
+        """Return ``(coef, intercept)`` for ridge penalty ``alpha`` (0 = OLS)."""
+        if not self.n:
+            raise ValueError("no samples accumulated")
+        if alpha:
+            coef = np.linalg.solve(self.xx + alpha * np.eye(len(self.xy)), self.xy)
+        else:
+            coef = np.linalg.lstsq(self.xx, self.xy, rcond=None)[0]
+        return coef, self.y_mean - self.x_mean @ coef
+
+
+class StreamingMetrics:
+    """MAE / RMSE / R² accumulated chunk by chunk in constant memory."""
+
+    def __init__(self):
+        self.n       = 0
+        self.abs_err = 0.0
+        self.sq_err  = 0.0
+        self.y_mean  = 0.0
+        self.y_m2    = 0.0
+
+    def update(self, y_true, y_pred):
+        y_true = np.asarray(y_true, dtype=np.float64)
+        err = y_true - np.asarray(y_pred, dtype=np.float64)
+        m = len(y_true)
+        if not m:
+            return self
+        self.abs_err += np.abs(err).sum()
+        self.sq_err  += err @ err
+        mean = y_true.mean()
+        total = self.n + m
+        delta = mean - self.y_mean
+        self.y_m2   += ((y_true - mean) ** 2).sum() + delta * delta * self.n * m / total
+        self.y_mean += delta * m / total
+        self.n = total
+        return self
+
+    def result(self):
+        return {
+            "mae":  self.abs_err / self.n,
+            "rmse": float(np.sqrt(self.sq_err / self.n)),
+            "r2":   1.0 - self.sq_err / self.y_m2 if self.y_m2 else 0.0,
+        }
+
+
+def iter_chunks(source, chunksize=100_000):
+    """Yield DataFrame chunks from a CSV path, or pass an iterable of chunks through."""
+    if isinstance(source, (str, os.PathLike)):
+        import pandas as pd
+        yield from pd.read_csv(source, chunksize=chunksize, usecols=FEATURES + [TARGET])
+    else:
+        yield from source
+
+
+def scan_categories(source, chunksize=100_000):
+    """One pass collecting the sorted categories, as ``LabelEncoder`` would fit them."""
+    seen = {"education": set(), "job_role": set()}
+    for chunk in iter_chunks(source, chunksize):
+        for col, values in seen.items():
+            values.update(chunk[col].unique())
+    return {col: sorted(str(v) for v in values) for col, values in seen.items()}
+
+
+def train_stream(source, alpha=0.0, chunksize=100_000, categories=None):
+    """Fit a linear (``alpha=0``) or ridge model over CSV chunks; return a ``SalaryModel``.
+
+    ``source`` is a CSV path or an iterable of DataFrame chunks. Memory is
+    bounded by one chunk. Without ``categories`` the data is read twice:
+    a first pass discovers them so the codes match an in-memory
+    ``LabelEncoder``. That needs a path or a re-iterable collection of
+    chunks, so a one-shot iterator (a generator, or
+    ``pd.read_csv(..., chunksize=...)``) must come with
+    ``categories={"education": [...], "job_role": [...]}``. Rows with a
+    category outside that list raise ``KeyError``.
+    """
+    if categories is None:
+        if not isinstance(source, (str, os.PathLike)) and iter(source) is source:
+            raise TypeError("a one-shot chunk iterator can only be read once; pass categories= "
+                            "or a CSV path so the category scan can make its own pass")
+        categories = scan_categories(source, chunksize)
+    encoder = SalaryModel(np.zeros(len(FEATURES)), 0.0,
+                          categories["education"], categories["job_role"])
+    stats = SufficientStats()
+    for chunk in iter_chunks(source, chunksize):
+        X = np.column_stack([
+            chunk["experience_years"].to_numpy(dtype=np.float64),
+            encoder._encode(chunk["education"], encoder._columns[0]),
+            encoder._encode(chunk["job_role"],  encoder._columns[1]),
+        ])
+        for col, size in ((1, len(encoder.education)), (2, len(encoder.job_role))):
+            if len(X) and X[:, col].max() == size:
+                raise KeyError(f"{FEATURES[col]!r} has a category outside {categories[FEATURES[col]]}")
+        stats.update(X, chunk[TARGET].to_numpy())
+    coef, intercept = stats.solve(alpha)
+    return SalaryModel(coef, intercept, encoder.education, encoder.job_role)
+
+
+def evaluate_stream(model, source, chunksize=100_000, unknown="error"):
+    """Score a ``SalaryModel`` over CSV chunks; return ``{"mae", "rmse", "r2"}``."""
+    metrics = StreamingMetrics()
+    out = np.empty(chunksize)
+    for chunk in iter_chunks(source, chunksize):
+        buf = out[:len(chunk)] if len(chunk) <= len(out) else None
+        metrics.update(chunk[TARGET].to_numpy(), model.predict_many(chunk, out=buf, unknown=unknown))
+    return metrics.result()
+
+
+# ─────────────────────────────────────────────────────────────
+# 8. CROSS-VALIDATED ALPHA SWEEP
+# ─────────────────────────────────────────────────────────────
+ALPHAS = (0.0, 0.01, 0.1, 1.0, 10.0, 100.0, 1000.0)
+
+
+_WORKER_DATA = None  # (shared memory, rows) in a cross-validation worker
+
+
+def _init_fold_worker(name, shape):
+    from multiprocessing import shared_memory
+    global _WORKER_DATA
+    shm = shared_memory.SharedMemory(name=name)
+    _WORKER_DATA = (shm, np.ndarray(shape, dtype=np.float64, buffer=shm.buf))
+
+
+def _fold_stats(start, stop, X=None, y=None):
+    """Statistics of rows ``start:stop`` of ``X``/``y`` (the worker's shared ``[X | y]`` by default)."""
+    if X is None:
+        rows = _WORKER_DATA[1][start:stop]
+        X, y, start, stop = rows[:, :-1], rows[:, -1], 0, len(rows)
+    return SufficientStats(X.shape[1]).update(X[start:stop], y[start:stop])
+
+
+def _held_out_sse(stats, coef, intercept):
+    """Squared error of ``(coef, intercept)`` on the rows behind ``stats``.
+
+    Expanding each residual around the fold means leaves only centred terms
+    plus a constant offset, so no pass over the rows is needed.
+    """
+    offset = stats.y_mean - intercept - stats.x_mean @ coef
+    return stats.yy - 2 * coef @ stats.xy + coef @ stats.xx @ coef + stats.n * offset * offset
+
+
+def cross_validate_alphas(X, y, alphas=ALPHAS, n_folds=5, seed=42, n_workers=1):
+    """K-fold CV over a ridge ``alpha`` grid (``0`` = ordinary least squares).
+
+    Each fold is reduced once to ``SufficientStats``. That is a single
+    d x d product per fold, so it runs serially by default. With
+    ``n_workers > 1`` the shuffled rows are placed once in shared memory
+    and each worker process receives only a fold's ``(start, stop)``
+    range, which pays off only for very large inputs. A training set's
+    statistics are then the merge of the
+    other folds. One eigendecomposition of its XᵀX solves every alpha, and
+    each alpha is scored on the held-out fold's statistics. The whole grid
+    costs roughly one pass over the data.
+
+    Returns a dict with per-alpha ``results`` (mean/std R², mean RMSE,
+    per-fold R² and solve seconds), ``best_alpha``, ``stats_seconds``,
+    ``total_seconds`` and the full-data ``stats``. The final model is
+    ``stats.solve(best_alpha)``.
+    """
+    start = time.perf_counter()
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if not 2 <= n_folds <= len(y):
+        raise ValueError(f"n_folds must be between 2 and the number of rows, got {n_folds}")
+    # Shuffle once so every fold is a contiguous range of rows.
+    order = np.random.RandomState(seed).permutation(len(y))
+    bounds = np.cumsum([0] + [len(f) for f in np.array_split(order, n_folds)])
+    ranges = list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+    shape = (len(y), X.shape[1] + 1)
+
+    if n_workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        from multiprocessing import shared_memory
+        shm = shared_memory.SharedMemory(create=True, size=max(1, 8 * shape[0] * shape[1]))
+        try:
+            data = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+            data[:, :-1], data[:, -1] = X[order], y[order]
+            with ProcessPoolExecutor(min(n_workers, n_folds), initializer=_init_fold_worker,
+                                     initargs=(shm.name, shape)) as pool:
+                fold_stats = list(pool.map(_fold_stats, *zip(*ranges)))
+            del data
+        finally:
+            shm.close()
+            shm.unlink()
+    else:
+        X, y = X[order], y[order]
+        fold_stats = [_fold_stats(lo, hi, X, y) for lo, hi in ranges]
+    stats_seconds = time.perf_counter() - start
+
+    scores = {alpha: {"r2": [], "rmse": [], "seconds": 0.0} for alpha in alphas}
+    for k, held_out in enumerate(fold_stats):
+        train_stats = SufficientStats(X.shape[1])
+        for j, other in enumerate(fold_stats):
+            if j != k:
+                train_stats.merge(other)
+        eigvals, eigvecs = np.linalg.eigh(train_stats.xx)
+        projected = eigvecs.T @ train_stats.xy
+        cutoff = eigvals.max() * len(eigvals) * np.finfo(np.float64).eps
+        for alpha in alphas:
+            t = time.perf_counter()
+            denom = eigvals + alpha
+            inv = np.divide(1.0, denom, out=np.zeros_like(denom), where=denom > cutoff)
+            coef = eigvecs @ (inv * projected)
+            intercept = train_stats.y_mean - train_stats.x_mean @ coef
+            sse = _held_out_sse(held_out, coef, intercept)
+            entry = scores[alpha]
+            entry["r2"].append(1.0 - sse / held_out.yy if held_out.yy else 0.0)
+            entry["rmse"].append(float(np.sqrt(sse / held_out.n)))
+            entry["seconds"] += time.perf_counter() - t
+
+    results = [{
+        "alpha":     alpha,
+        "mean_r2":   float(np.mean(s["r2"])),
+        "std_r2":    float(np.std(s["r2"])),
+        "mean_rmse": float(np.mean(s["rmse"])),
+        "fold_r2":   [float(r) for r in s["r2"]],
+        "seconds":   s["seconds"],
+    } for alpha, s in scores.items()]
+    best = max(results, key=lambda r: r["mean_r2"])
+
+    total = SufficientStats(X.shape[1])
+    for s in fold_stats:
+        total.merge(s)
+    return {
+        "results":       results,
+        "best_alpha":    best["alpha"],
+        "stats_seconds": stats_seconds,
+        "total_seconds": time.perf_counter() - start,
+        "stats":         total,
+    }
+
+
+# ─────────────────────────────────────────────────────────────
+# SCRIPT
+# ─────────────────────────────────────────────────────────────
+def main(artifact_path=ARTIFACT_PATH):
+    import warnings
+    warnings.filterwarnings("ignore")
+
+    df = generate_data()
+    print("📊 Dataset Sample:")
+    print(df.head(10).to_string(index=False))
+    print(f"\nShape: {df.shape}")
+    print(f"Salary range: ${df['salary'].min():,} — ${df['salary'].max():,}")
+
+    X_train, X_test, y_train, y_test, le_edu, le_role = preprocess(df)
+    print(f"\n✅ Train size: {len(X_train)} | Test size: {len(X_test)}")
+
+    lr, rid = train(X_train, y_train)
+    y_pred_lr  = lr.predict(X_test)
+    y_pred_rid = rid.predict(X_test)
+
+    print("\n" + "="*45)
+    print("          MODEL EVALUATION RESULTS")
+    print("="*45)
+    r2_lr  = evaluate("Linear Regression", y_test, y_pred_lr)
+    r2_rid = evaluate("Ridge Regression",  y_test, y_pred_rid)
+
+    winner = "Linear Regression" if r2_lr > r2_rid else "Ridge Regression"
+    print(f"\n🏆 Best Model: {winner}")
+
+    cv = cross_validate_alphas(X_train, y_train)
+    print("\n" + "="*45)
+    print("      5-FOLD CV — RIDGE ALPHA SWEEP")
+    print("="*45)
+    for r in cv["results"]:
+        print(f"   α={r['alpha']:<8g} R²: {r['mean_r2']:.4f} ± {r['std_r2']:.4f} | "
+              f"RMSE: ${r['mean_rmse']:,.0f}")
+    # Report only: the artifact below stays the LinearRegression fit so the
+    # sample predictions match the original script.
+    print(f"\n🎯 Best alpha: {cv['best_alpha']:g} ({cv['total_seconds']*1000:.1f} ms for the whole grid, "
+          f"report only)")
+
+    plot_results(df, y_test, y_pred_lr)
+    print("\n📊 Plot saved as results.png")
+
+    SalaryModel.from_estimator(lr, le_edu, le_role).save(artifact_path)
+
+    print("\n" + "="*45)
+    print("        SAMPLE PREDICTIONS")
+    print("="*45)
+
+    samples = [
+        {"experience_years": 2,  "education": "Bachelor's", "job_role": "Data Analyst"},
+        {"experience_years": 5,  "education": "Master's",   "job_role": "Software Engineer"},
+        {"experience_years": 10, "education": "PhD",        "job_role": "ML Engineer"},
+    ]
+
+    model = SalaryModel.load(artifact_path)
+    preds = model.predict([s["experience_years"] for s in samples],
+                          [s["education"] for s in samples],
+                          [s["job_role"] for s in samples])
+    for row, pred in zip(samples, preds):
+        print(f"\n  👤 {row['job_role']} | {row['education']} | {row['experience_years']} yrs exp")
+        print(f"     Predicted Salary: ${pred:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,10 +11,33 @@ Implements the following search/similarity algorithms:
 
 from __future__ import annotations
 
+import hashlib
+import heapq
 import math
+import os
+import random
 import re
-from collections import Counter, defaultdict
-from typing import Dict, List, Tuple
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter, OrderedDict, defaultdict
+from collections.abc import Mapping, Sequence
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import compress, islice
+from operator import attrgetter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from _common import PickleByConfig, SectionFile, write_sections
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for search_batch
+    np = None
+
+# Upper bound on the elements of one broadcast |a - b| block (L1 distances).
+_L1_BLOCK_ELEMENTS = 1 << 24
 
 
 # ---------------------------------------------------------------------------
@@ -33,6 +56,16 @@ def build_tfidf_vector(doc_tokens: List[str], vocab: List[str]) -> List[float]:
     return [freq.get(word, 0) / total for word in vocab]
 
 
+def build_sparse_vector(doc_tokens: List[str],
+                        term_ids: Dict[str, int]) -> Tuple[List[int], List[float]]:
+    """Sparse counterpart of build_tfidf_vector: sorted (term_ids, weights)."""
+    freq = Counter(doc_tokens)
+    total = len(doc_tokens) if doc_tokens else 1
+    pairs = sorted((term_ids[word], count / total) for word, count in freq.items()
+                   if word in term_ids)
+    return [i for i, _ in pairs], [w for _, w in pairs]
+
+
 def build_vocab(corpus: List[str]) -> List[str]:
     """Build sorted vocabulary from a corpus."""
     vocab = set()
@@ -41,11 +74,1016 @@ def build_vocab(corpus: List[str]) -> List[str]:
     return sorted(vocab)
 
 
+# ---------------------------------------------------------------------------
+# Shared corpus index
+# ---------------------------------------------------------------------------
+
+class _Postings:
+    """One term's postings as parallel arrays (doc_id, tf, TF weight) in doc_id order."""
+
+    __slots__ = ("doc_ids", "tfs", "weights")
+
+    def __init__(self, doc_ids=None, tfs=None, weights=None):
+        self.doc_ids = array("q") if doc_ids is None else doc_ids
+        self.tfs = array("q") if tfs is None else tfs
+        self.weights = array("d") if weights is None else weights
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def append(self, doc_id: int, tf: int, weight: float) -> None:
+        self.doc_ids.append(doc_id)
+        self.tfs.append(tf)
+        self.weights.append(weight)
+
+
+class CorpusIndex:
+    """
+    Single-pass index over a corpus that every search class can share.
+
+    Each document is tokenized exactly once. The index keeps:
+      vocab / term_ids     - vocabulary (sorted at build time, new terms
+                             appended) and its term ids
+      doc_lengths          - token count per document
+      df                   - document frequency per term (live documents)
+      token_sets           - set of distinct tokens per document (Jaccard)
+      postings             - term_id -> _Postings of doc_id / tf / TF weight
+      indptr/indices/weights, sq_norms, l1_norms
+                           - sparse TF vectors in CSR form and their norms
+
+    Pass the same instance to several searches instead of the raw corpus:
+
+        index = CorpusIndex(corpus)
+        bm25, cosine = BM25Search(index), CosineSimilaritySearch(index)
+
+    The index is updatable: add_documents appends, remove_documents marks
+    tombstones, and both cost time proportional to the documents touched.
+    Searches skip tombstoned documents; compact() drops them and renumbers.
+    ``generation`` increases on every change, ``epoch`` on every compaction.
+
+    save() writes the index as an immutable segment file; load() maps one
+    back without re-tokenizing anything, and merge() combines segments.
+    A loaded index is copied into memory the first time it is changed.
+    """
+
+    def __init__(self, corpus: List[str]):
+        self.corpus: List[str] = []
+        self.doc_lengths: List[int] = []
+        self.token_sets: List[frozenset] = []
+        self.vocab: List[str] = []
+        self.term_ids: Dict[str, int] = {}
+        self.df: Dict[str, int] = defaultdict(int)
+        self.postings: Dict[int, _Postings] = {}
+        self.indptr = array("q", [0])
+        self.indices = array("q")
+        self.weights = array("d")
+        self.sq_norms: List[float] = []
+        self.l1_norms: List[float] = []
+        self.deleted: set = set()
+        self.total_length = 0
+        self.generation = 0
+        self.epoch = 0
+        self._segment: Optional[_SegmentFile] = None
+        self._append(corpus)
+
+    def __len__(self) -> int:
+        return len(self.corpus)
+
+    @property
+    def num_docs(self) -> int:
+        """Number of live (not deleted) documents."""
+        return len(self.corpus) - len(self.deleted)
+
+    def is_live(self, doc_id: int) -> bool:
+        return 0 <= doc_id < len(self.corpus) and doc_id not in self.deleted
+
+    def doc_vector(self, doc_id: int) -> Tuple[List[int], List[float]]:
+        """Return document ``doc_id`` as sorted (term_ids, weights)."""
+        start, end = self.indptr[doc_id], self.indptr[doc_id + 1]
+        return list(self.indices[start:end]), list(self.weights[start:end])
+
+    def _append(self, docs: List[str]) -> List[int]:
+        doc_counts = []
+        for doc in docs:
+            tokens = preprocess(doc)
+            doc_counts.append((doc, len(tokens), Counter(tokens)))
+        return self._append_counts(doc_counts)
+
+    def _append_counts(self, doc_counts: List[Tuple[str, int, Dict[str, int]]]) -> List[int]:
+        """Index already-tokenized documents given as (text, length, term counts)."""
+        self._thaw()
+        new_terms = set()
+        for _, _, counts in doc_counts:
+            new_terms.update(t for t in counts if t not in self.term_ids)
+        for term in sorted(new_terms):
+            self.term_ids[term] = len(self.vocab)
+            self.vocab.append(term)
+            self.postings[self.term_ids[term]] = _Postings()
+
+        doc_ids = []
+        for doc, length, counts in doc_counts:
+            doc_id = len(self.corpus)
+            doc_ids.append(doc_id)
+            self.corpus.append(doc)
+            self.doc_lengths.append(length)
+            self.token_sets.append(frozenset(counts))
+            self.total_length += length
+            total = length or 1
+            row = sorted((self.term_ids[term], tf) for term, tf in counts.items())
+            weights = [tf / total for _, tf in row]
+            for (term_id, tf), weight in zip(row, weights):
+                self.df[self.vocab[term_id]] += 1
+                self.postings[term_id].append(doc_id, tf, weight)
+                self.indices.append(term_id)
+            self.weights.extend(weights)
+            self.indptr.append(len(self.indices))
+            self.sq_norms.append(sum(w ** 2 for w in weights))
+            self.l1_norms.append(sum(weights))
+        return doc_ids
+
+    def add_documents(self, docs: List[str]) -> List[int]:
+        """Index ``docs`` and return their new doc ids."""
+        doc_ids = self._append(list(docs))
+        self.generation += 1
+        return doc_ids
+
+    def remove_documents(self, doc_ids: Iterable[int]) -> None:
+        """
+        Tombstone ``doc_ids``; their postings stay until :meth:`compact`.
+
+        All ids are validated before anything changes, so an unknown, deleted
+        or repeated id raises ``KeyError`` and leaves the index untouched.
+        """
+        doc_ids = list(doc_ids)
+        seen = set()
+        for doc_id in doc_ids:
+            if not self.is_live(doc_id) or doc_id in seen:
+                raise KeyError(doc_id)
+            seen.add(doc_id)
+        self._thaw()
+        for doc_id in doc_ids:
+            self.deleted.add(doc_id)
+            self.total_length -= self.doc_lengths[doc_id]
+            for term in self.token_sets[doc_id]:
+                self.df[term] -= 1
+        self.generation += 1
+
+    def update_document(self, doc_id: int, text: str) -> int:
+        """Replace a document; like Lucene this is delete + add, so the new id is returned."""
+        self.remove_documents([doc_id])
+        return self.add_documents([text])[0]
+
+    def compact(self) -> Dict[int, int]:
+        """
+        Rebuild without tombstoned documents (sorting the vocabulary again)
+        and return the ``{old_id: new_id}`` mapping of surviving documents.
+
+        Like :meth:`merge` this reuses the index instead of re-tokenizing:
+        postings are filtered and renumbered, and CSR rows are only re-sorted
+        (and their norms recomputed) where the new term ids reorder them, so
+        the result equals building from the surviving texts.
+        """
+        n_docs = len(self.corpus)
+        live = [d for d in range(n_docs) if d not in self.deleted]
+        new_doc = array("q", [-1]) * n_docs
+        for new, old in enumerate(live):
+            new_doc[old] = new
+        terms = sorted(term for term in self.vocab if self.df.get(term, 0) > 0)
+        new_term = array("q", [-1]) * len(self.vocab)
+        for new, term in enumerate(terms):
+            new_term[self.term_ids[term]] = new
+
+        index = CorpusIndex([])
+        index.corpus = [self.corpus[d] for d in live]
+        index.doc_lengths = [self.doc_lengths[d] for d in live]
+        index.token_sets = [self.token_sets[d] for d in live]
+        index.vocab = terms
+        index.term_ids = {term: i for i, term in enumerate(terms)}
+        index.total_length = sum(index.doc_lengths)
+        for term in terms:
+            old = self.postings[self.term_ids[term]]
+            keep = [new_doc[d] >= 0 for d in old.doc_ids]
+            postings = index.postings[index.term_ids[term]] = _Postings(
+                array("q", [new_doc[d] for d in compress(old.doc_ids, keep)]),
+                array("q", compress(old.tfs, keep)), array("d", compress(old.weights, keep)))
+            index.df[term] = len(postings)
+        # Without terms appended since the last sort, no row changes order.
+        kept = [t for t in new_term if t >= 0]
+        in_order = all(a < b for a, b in zip(kept, kept[1:]))
+        indptr, indices, weights = self.indptr, self.indices, self.weights
+        sq_norms, l1_norms = index.sq_norms, index.l1_norms
+        new_indices, new_weights, new_indptr = index.indices, index.weights, index.indptr
+        for d in live:
+            start, end = indptr[d], indptr[d + 1]
+            row = [new_term[t] for t in indices[start:end]]
+            values = weights[start:end]
+            if in_order or all(a < b for a, b in zip(row, row[1:])):
+                sq_norms.append(self.sq_norms[d])
+                l1_norms.append(self.l1_norms[d])
+            else:
+                pairs = sorted(zip(row, values))
+                row, values = [t for t, _ in pairs], [w for _, w in pairs]
+                sq_norms.append(sum(w ** 2 for w in values))
+                l1_norms.append(sum(values))
+            new_indices.extend(row)
+            new_weights.extend(values)
+            new_indptr.append(len(new_indices))
+
+        generation, epoch = self.generation, self.epoch
+        self.__dict__.update(index.__dict__)
+        self.generation, self.epoch = generation + 1, epoch + 1
+        return {old: new for new, old in enumerate(live)}
+
+    # -- segment files -------------------------------------------------------
+
+    def save(self, path: str) -> None:
+        """Write the index (tombstones included) as a segment file."""
+        _write_segment(path, self._segment_arrays(), {"total_length": self.total_length})
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "CorpusIndex":
+        """
+        Open a segment written by :meth:`save`.
+
+        With ``mmap=True`` the arrays are memory-mapped rather than read, so
+        loading does no per-document work and processes opening the same
+        file share its pages. Every table is a read-only view until the
+        first write, which copies the index into memory.
+        """
+        return cls._from_segment(_SegmentFile(path, mmap))
+
+    @classmethod
+    def merge(cls, indexes: Iterable["CorpusIndex"]) -> "CorpusIndex":
+        """
+        Merge the live documents of ``indexes``, in order, into a new index
+        without re-tokenizing; the result equals building from their texts.
+        """
+        doc_counts = []
+        for index in indexes:
+            rows: List[Dict[str, int]] = [{} for _ in range(len(index))]
+            for term_id, term in enumerate(index.vocab):
+                postings = index.postings[term_id]
+                for doc_id, tf in zip(postings.doc_ids, postings.tfs):
+                    rows[doc_id][term] = tf
+            doc_counts.extend((index.corpus[d], index.doc_lengths[d], rows[d])
+                              for d in range(len(index)) if d not in index.deleted)
+        merged = cls([])
+        merged._append_counts(doc_counts)
+        return merged
+
+    @classmethod
+    def _from_segment(cls, segment: "_SegmentFile") -> "CorpusIndex":
+        index = cls.__new__(cls)
+        index._segment = segment
+        index.corpus = _MappedStrings(segment.corpus_strings, segment.corpus_offsets)
+        index.vocab = _MappedStrings(segment.vocab_strings, segment.vocab_offsets)
+        index.term_ids = _MappedTermIds(index.vocab, segment.term_order)
+        index.df = _MappedDf(index.term_ids, segment.df)
+        index.postings = _MappedPostings(segment)
+        index.token_sets = _MappedTokenSets(index)
+        index.doc_lengths = segment.doc_lengths
+        index.indptr, index.indices, index.weights = segment.indptr, segment.indices, segment.weights
+        index.sq_norms, index.l1_norms = segment.sq_norms, segment.l1_norms
+        index.deleted = set(segment.deleted)
+        index.total_length = segment.meta["total_length"]
+        index.generation = index.epoch = 0
+        return index
+
+    def _thaw(self) -> None:
+        """Copy a loaded segment into ordinary mutable containers."""
+        if self._segment is None:
+            return
+        self.corpus = list(self.corpus)
+        self.vocab = list(self.vocab)
+        self.term_ids = {term: i for i, term in enumerate(self.vocab)}
+        self.df = defaultdict(int, self.df.items())
+        self.token_sets = list(self.token_sets)
+        self.postings = {
+            term_id: _Postings(array("q", p.doc_ids), array("q", p.tfs), array("d", p.weights))
+            for term_id, p in self.postings.items()
+        }
+        self.doc_lengths = list(self.doc_lengths)
+        self.indptr, self.indices = array("q", self.indptr), array("q", self.indices)
+        self.weights = array("d", self.weights)
+        self.sq_norms, self.l1_norms = list(self.sq_norms), list(self.l1_norms)
+        self._segment = None
+
+    def _segment_arrays(self) -> Dict[str, array]:
+        corpus_strings, corpus_offsets = _pack_strings(self.corpus)
+        vocab_strings, vocab_offsets = _pack_strings(self.vocab)
+        post_ptr, post_docs, post_tfs, post_weights = array("q", [0]), array("q"), array("q"), array("d")
+        for term_id in range(len(self.vocab)):
+            postings = self.postings[term_id]
+            post_docs.extend(postings.doc_ids)
+            post_tfs.extend(postings.tfs)
+            post_weights.extend(postings.weights)
+            post_ptr.append(len(post_docs))
+        return {
+            "corpus_strings": corpus_strings, "corpus_offsets": corpus_offsets,
+            "vocab_strings": vocab_strings, "vocab_offsets": vocab_offsets,
+            "term_order": array("q", sorted(range(len(self.vocab)),
+                                            key=lambda t: self.vocab[t].encode("utf-8"))),
+            "df": array("q", (self.df.get(term, 0) for term in self.vocab)),
+            "doc_lengths": array("q", self.doc_lengths),
+            "post_ptr": post_ptr, "post_docs": post_docs,
+            "post_tfs": post_tfs, "post_weights": post_weights,
+            "indptr": array("q", self.indptr), "indices": array("q", self.indices),
+            "weights": array("d", self.weights),
+            "sq_norms": array("d", self.sq_norms), "l1_norms": array("d", self.l1_norms),
+            "deleted": array("q", sorted(self.deleted)),
+        }
+
+    def __getstate__(self):
+        # An unmodified loaded index re-opens its file in the receiving process.
+        if self._segment is not None:
+            return {"_segment": self._segment, "generation": self.generation, "epoch": self.epoch}
+        return self.__dict__
+
+    def __setstate__(self, state) -> None:
+        if state.get("_segment") is not None:
+            self.__dict__.update(CorpusIndex._from_segment(state["_segment"]).__dict__)
+            self.generation, self.epoch = state["generation"], state["epoch"]
+        else:
+            self.__dict__.update(state)
+
+
+def _as_index(corpus: Union[List[str], CorpusIndex]) -> CorpusIndex:
+    return corpus if isinstance(corpus, CorpusIndex) else CorpusIndex(corpus)
+
+
+def _doc_range(index: CorpusIndex, doc_range: Optional[Tuple[int, int]]) -> range:
+    """Doc ids a search covers: ``doc_range`` clipped to the index, or all of it."""
+    if doc_range is None:
+        return range(len(index))
+    start, stop = doc_range
+    return range(max(0, start), max(0, min(stop, len(index))))
+
+
+def _top_k(scored: Iterable[Tuple[float, int]], top_k: int,
+           higher_is_better: bool) -> List[Tuple[float, int]]:
+    """
+    Best ``top_k`` (score, doc_id) pairs, best first, ties going to the
+    lower doc id. A bounded heap keeps this O(n log k) time, O(k) memory.
+    """
+    if higher_is_better:
+        return heapq.nsmallest(top_k, scored, key=lambda e: (-e[0], e[1]))
+    return heapq.nsmallest(top_k, scored)
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of ``values`` (0.0 when empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+
+def _postings_span(postings: _Postings, docs: range) -> Tuple[int, int]:
+    """Positions [lo, hi) of the postings whose doc ids fall in ``docs``."""
+    doc_ids = postings.doc_ids
+    if docs.start == 0 and (not doc_ids or doc_ids[-1] < docs.stop):
+        return 0, len(doc_ids)
+    return bisect_left(doc_ids, docs.start), bisect_left(doc_ids, docs.stop)
+
+
+# ---------------------------------------------------------------------------
+# Segment files
+# ---------------------------------------------------------------------------
+#
+# A section file (see _common) with magic "SRCHSEG1". Arrays, for N
+# documents and V terms:
+#   corpus_strings / corpus_offsets   utf-8 texts; doc i is strings[off[i]:off[i + 1]]
+#   vocab_strings / vocab_offsets     utf-8 terms, indexed by term id
+#   term_order      int64[V]      term ids sorted bytewise by term
+#   df              int64[V]      live document frequency
+#   doc_lengths     int64[N]
+#   post_ptr        int64[V + 1]  postings of term t are [post_ptr[t], post_ptr[t + 1])
+#   post_docs / post_tfs / post_weights   int64 / int64 / float64 postings
+#   indptr / indices / weights            CSR document vectors
+#   sq_norms / l1_norms                   float64[N]
+#   deleted         int64         tombstoned doc ids
+# BM25 segments add idf (float64[V]) and block_ptr (int64[V + 1]) /
+# block_max (float64) with each term's Block-Max WAND bounds.
+
+_SEGMENT_MAGIC = b"SRCHSEG1"
+_SEGMENT_SECTIONS = [
+    ("corpus_strings", "B"), ("corpus_offsets", "q"), ("vocab_strings", "B"),
+    ("vocab_offsets", "q"), ("term_order", "q"), ("df", "q"), ("doc_lengths", "q"),
+    ("post_ptr", "q"), ("post_docs", "q"), ("post_tfs", "q"), ("post_weights", "d"),
+    ("indptr", "q"), ("indices", "q"), ("weights", "d"), ("sq_norms", "d"),
+    ("l1_norms", "d"), ("deleted", "q"),
+    ("idf", "d"), ("block_ptr", "q"), ("block_max", "d"),
+]
+
+
+def _pack_strings(strings: Sequence[str]) -> Tuple[array, array]:
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = array("q", [0])
+    for raw in encoded:
+        offsets.append(offsets[-1] + len(raw))
+    return array("B", b"".join(encoded)), offsets
+
+
+def _write_segment(path: str, arrays: Dict[str, array], meta: dict) -> None:
+    write_sections(path, _SEGMENT_MAGIC, _SEGMENT_SECTIONS, arrays, meta)
+
+
+class _SegmentFile(SectionFile):
+    """Typed, read-only views over a segment file."""
+
+    MAGIC = _SEGMENT_MAGIC
+    SECTIONS = _SEGMENT_SECTIONS
+    KIND = "search segment"
+
+
+class _MappedStrings(Sequence):
+    """Read-only list of strings over a packed utf-8 blob and its offsets."""
+
+    def __init__(self, strings: memoryview, offsets: memoryview):
+        self._strings = strings
+        self._offsets = offsets
+
+    def __getitem__(self, i: int) -> str:
+        i = range(len(self))[i]
+        return str(self._strings[self._offsets[i]:self._offsets[i + 1]], "utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        return (self[i] for i in range(len(self)))
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def raw(self, i: int) -> bytes:
+        return bytes(self._strings[self._offsets[i]:self._offsets[i + 1]])
+
+
+class _MappedTermIds(Mapping):
+    """``{term: term_id}`` view that binary-searches the sorted term order."""
+
+    def __init__(self, vocab: _MappedStrings, order: memoryview):
+        self._vocab = vocab
+        self._order = order
+
+    def __getitem__(self, term: str) -> int:
+        raw = term.encode("utf-8")
+        lo, hi = 0, len(self._order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            candidate = self._vocab.raw(self._order[mid])
+            if candidate < raw:
+                lo = mid + 1
+            elif candidate == raw:
+                return self._order[mid]
+            else:
+                hi = mid
+        raise KeyError(term)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._vocab)
+
+    def __len__(self) -> int:
+        return len(self._vocab)
+
+
+class _MappedDf(Mapping):
+    """``{term: document frequency}`` view over the df array."""
+
+    def __init__(self, term_ids: _MappedTermIds, df: memoryview):
+        self._term_ids = term_ids
+        self._df = df
+
+    def __getitem__(self, term: str) -> int:
+        return self._df[self._term_ids[term]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._term_ids)
+
+    def __len__(self) -> int:
+        return len(self._term_ids)
+
+
+class _MappedPostings(Mapping):
+    """``{term_id: _Postings}`` whose arrays are slices of the segment."""
+
+    def __init__(self, segment: _SegmentFile):
+        self._segment = segment
+
+    def __getitem__(self, term_id: int) -> _Postings:
+        seg = self._segment
+        if not 0 <= term_id < len(seg.post_ptr) - 1:
+            raise KeyError(term_id)
+        start, end = seg.post_ptr[term_id], seg.post_ptr[term_id + 1]
+        return _Postings(seg.post_docs[start:end], seg.post_tfs[start:end],
+                         seg.post_weights[start:end])
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(len(self)))
+
+    def __len__(self) -> int:
+        return len(self._segment.post_ptr) - 1
+
+
+class _MappedTokenSets(Sequence):
+    """Per-document token sets rebuilt from the CSR rows on first access."""
+
+    def __init__(self, index: CorpusIndex):
+        self._index = index
+        self._sets: List[Optional[frozenset]] = [None] * len(index.corpus)
+
+    def __getitem__(self, doc_id: int) -> frozenset:
+        doc_id = range(len(self))[doc_id]
+        token_set = self._sets[doc_id]
+        if token_set is None:
+            index = self._index
+            vocab = index.vocab
+            start, end = index.indptr[doc_id], index.indptr[doc_id + 1]
+            token_set = self._sets[doc_id] = frozenset(vocab[t] for t in index.indices[start:end])
+        return token_set
+
+    def __iter__(self) -> Iterator[frozenset]:
+        return (self[i] for i in range(len(self)))
+
+    def __len__(self) -> int:
+        return len(self._sets)
+
+
+# ---------------------------------------------------------------------------
+# Query result cache
+# ---------------------------------------------------------------------------
+
+class QueryCache(PickleByConfig):
+    """
+    Opt-in, thread-safe LRU cache of search results for one index.
+
+    Pass it to a search (``BM25Search(index, cache=QueryCache())``); several
+    searches over the same index may share one. Entries are keyed by the
+    algorithm and its parameters, the normalized query tokens, top_k and
+    doc_range. The whole cache is dropped as soon as a lookup sees a new
+    index generation, so results never outlive a corpus change.
+    ``maxsize`` bounds the number of entries, ``max_bytes`` their
+    approximate memory and ``ttl`` their age in seconds. A pickled copy
+    starts empty with the same configuration.
+    """
+
+    _PICKLED = ("maxsize", "ttl", "max_bytes")
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None,
+                 max_bytes: Optional[int] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._data: OrderedDict = OrderedDict()  # key -> (expires, size, results)
+        self._generation: Optional[int] = None
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+        self.evictions = self.expirations = self.invalidations = 0
+
+    def get(self, key, generation: int):
+        if self.maxsize <= 0:
+            return None
+        with self._lock:
+            self._check_generation(generation)
+            entry = self._data.get(key)
+            if entry is not None and entry[0] is not None and entry[0] <= time.monotonic():
+                self._drop(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key, results: tuple, generation: int) -> None:
+        size = _result_size(key, results)
+        if self.maxsize <= 0 or (self.max_bytes is not None and size > self.max_bytes):
+            return
+        with self._lock:
+            self._check_generation(generation)
+            if key in self._data:
+                self._drop(key)
+            expires = time.monotonic() + self.ttl if self.ttl is not None else None
+            self._data[key] = (expires, size, results)
+            self._bytes += size
+            while len(self._data) > self.maxsize or (
+                    self.max_bytes is not None and self._bytes > self.max_bytes):
+                self._drop(next(iter(self._data)))
+                self.evictions += 1
+
+    def _check_generation(self, generation: int) -> None:
+        if generation != self._generation:
+            self.invalidations += len(self._data)
+            self._data.clear()
+            self._bytes = 0
+            self._generation = generation
+
+    def _drop(self, key) -> None:
+        self._bytes -= self._data.pop(key)[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+            self.hits = self.misses = 0
+            self.evictions = self.expirations = self.invalidations = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses,
+                    "hit_rate": self.hits / lookups if lookups else 0.0,
+                    "evictions": self.evictions, "expirations": self.expirations,
+                    "invalidations": self.invalidations, "size": len(self._data),
+                    "bytes": self._bytes, "maxsize": self.maxsize, "max_bytes": self.max_bytes}
+
+
+def _result_size(key: tuple, results: tuple) -> int:
+    """Approximate bytes held by a cache entry: its key and result tuples."""
+    size = sys.getsizeof(key) + sum(sys.getsizeof(token) for token in key[2])
+    size += sys.getsizeof(results)
+    for score, doc_id, doc in results:
+        size += sys.getsizeof((score, doc_id, doc)) + sys.getsizeof(score) + sys.getsizeof(doc)
+    return size
+
+
+def _cached_search(search, params: tuple, q_tokens: List[str], top_k: int,
+                   doc_range: Optional[Tuple[int, int]], compute) -> List[Tuple[float, int, str]]:
+    """Return ``compute()``, through ``search.cache`` when the search has one."""
+    cache: Optional[QueryCache] = search.cache
+    if cache is None:
+        return compute()
+    key = (type(search).__name__, params, tuple(q_tokens), top_k,
+           None if doc_range is None else tuple(doc_range))
+    generation = search.index.generation
+    results = cache.get(key, generation)
+    if results is None:
+        results = tuple(compute())
+        cache.put(key, results, generation)
+    return list(results)
+
+
+# ---------------------------------------------------------------------------
+# Sparse vector storage
+# ---------------------------------------------------------------------------
+
+class _SparseVectorSearch:
+    """
+    Shared sparse TF-vector search over a :class:`CorpusIndex`.
+
+    The index keeps document vectors in CSR form, per-term postings of
+    (doc_id, weight) and each document's squared L2 and L1 norms. A query
+    only visits the postings of its own terms; every other document's score
+    follows from the norms alone, and those documents are pre-sorted so
+    only the best few are ever looked at.
+
+    Subclasses define how an overlapping term contributes (_overlap_term),
+    how the score is assembled (_score) and the ranking direction.
+    """
+
+    higher_is_better = False
+
+    def __init__(self, corpus: Union[List[str], CorpusIndex], cache: Optional[QueryCache] = None):
+        self.index = _as_index(corpus)
+        self.cache = cache
+        self._synced: Optional[Tuple[int, int]] = None
+        self._matrix_generation: Optional[int] = None
+        self._ann: Optional[IVFIndex] = None
+        self._ann_params: dict = {}
+        self._ann_synced: Optional[Tuple[int, int, int]] = None
+
+    @property
+    def corpus(self) -> List[str]:
+        return self.index.corpus
+
+    @property
+    def vocab(self) -> List[str]:
+        return self.index.vocab
+
+    @property
+    def term_ids(self) -> Dict[str, int]:
+        return self.index.term_ids
+
+    @property
+    def sq_norms(self) -> List[float]:
+        return self.index.sq_norms
+
+    @property
+    def l1_norms(self) -> List[float]:
+        return self.index.l1_norms
+
+    def _sync(self) -> None:
+        """
+        Catch up with documents added to the index since the last query.
+        ``_base_sorted`` holds (base key, doc_id) in ranking order (base key
+        negated when higher is better); new documents are inserted, a
+        compaction rebuilds it.
+        """
+        epoch, n_docs = self.index.epoch, len(self.corpus)
+        sign = -1.0 if self.higher_is_better else 1.0
+        if self._synced is None or self._synced[0] != epoch:
+            self._base_sorted = sorted((sign * self._base_key(d), d) for d in range(n_docs))
+        else:
+            for d in range(self._synced[1], n_docs):
+                insort(self._base_sorted, (sign * self._base_key(d), d))
+        self._synced = (epoch, n_docs)
+
+    def doc_vector(self, doc_id: int) -> Tuple[List[int], List[float]]:
+        """Return document ``doc_id`` as sorted (term_ids, weights)."""
+        return self.index.doc_vector(doc_id)
+
+    def __getstate__(self):
+        # The dense matrix and ANN index are rebuilt on demand rather than shipped.
+        state = dict(self.__dict__, _matrix_generation=None, _ann=None)
+        for name in ("_matrix", "_sq_norms32", "_norms32", "_deleted_ids"):
+            state.pop(name, None)
+        return state
+
+    def save(self, path: str) -> None:
+        """Write the underlying index as a segment file (see :meth:`CorpusIndex.save`)."""
+        self.index.save(path)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True):
+        """Search over a segment file opened with :meth:`CorpusIndex.load`."""
+        return cls(CorpusIndex.load(path, mmap))
+
+    def _query_vector(self, q_tokens: List[str]) -> Tuple[List[int], List[float]]:
+        """
+        Sparse query vector over live terms. Terms whose documents are all
+        deleted stay in the vocabulary until :meth:`CorpusIndex.compact`;
+        they are weighted like unknown words, exactly as after a rebuild.
+        """
+        q_ids, q_weights = build_sparse_vector(q_tokens, self.term_ids)
+        if not self.index.deleted:
+            return q_ids, q_weights
+        df, vocab = self.index.df, self.vocab
+        live = [(i, w) for i, w in zip(q_ids, q_weights) if df.get(vocab[i], 0) > 0]
+        return [i for i, _ in live], [w for _, w in live]
+
+    def _base_key(self, doc_id: int) -> float:
+        """Per-document key the score is monotonic in when nothing overlaps."""
+        return 0.0
+
+    def _overlap_term(self, q: float, d: float) -> float:
+        raise NotImplementedError
+
+    def _score(self, q_sq: float, q_l1: float, doc_id: int, overlap: float) -> float:
+        raise NotImplementedError
+
+    def search(self, query: str, top_k: int = 3,
+               doc_range: Optional[Tuple[int, int]] = None) -> List[Tuple[float, str]]:
+        """
+        Return the ``top_k`` (score, doc) pairs, optionally only among doc
+        ids in ``doc_range = (start, stop)`` (see :class:`ShardedSearch`).
+        """
+        return [(score, doc) for score, _, doc in self.search_with_ids(query, top_k, doc_range)]
+
+    def search_with_ids(self, query: str, top_k: int = 3,
+                        doc_range: Optional[Tuple[int, int]] = None) -> List[Tuple[float, int, str]]:
+        """Like :meth:`search` but returns (score, doc_id, doc); ties go to the lower doc id."""
+        if top_k <= 0:
+            return []
+        q_tokens = preprocess(query)
+        return _cached_search(self, (), q_tokens, top_k, doc_range,
+                              lambda: self._search_tokens(q_tokens, top_k, doc_range))
+
+    def _search_tokens(self, q_tokens: List[str], top_k: int,
+                       doc_range: Optional[Tuple[int, int]]) -> List[Tuple[float, int, str]]:
+        self._sync()
+        docs = _doc_range(self.index, doc_range)
+        q_ids, q_weights = self._query_vector(q_tokens)
+        q_sq = sum(w ** 2 for w in q_weights)
+        q_l1 = sum(q_weights)
+
+        overlaps: Dict[int, float] = {}
+        deleted = self.index.deleted
+        for term_id, q_w in zip(q_ids, q_weights):
+            postings = self.index.postings[term_id]
+            lo, hi = _postings_span(postings, docs)
+            for doc_id, d_w in zip(postings.doc_ids[lo:hi], postings.weights[lo:hi]):
+                if doc_id not in deleted:
+                    overlaps[doc_id] = overlaps.get(doc_id, 0.0) + self._overlap_term(q_w, d_w)
+        ranked = _top_k(((self._score(q_sq, q_l1, d, overlap), d) for d, overlap in overlaps.items()),
+                        top_k, self.higher_is_better)
+
+        # Non-overlapping documents come pre-sorted by (base key, doc_id) and
+        # their scores are monotonic in the key. ``extra`` is a bounded heap
+        # of the best of them, worst on top as (-ordered score, -doc_id).
+        # Stop at the first strictly worse score; on an equal score with a
+        # higher doc id, the rest of that key's run loses too, so skip it.
+        sign = -1.0 if self.higher_is_better else 1.0
+        extra: List[Tuple[float, int]] = []
+        base = self._base_sorted
+        i = 0
+        while i < len(base):
+            key, doc_id = base[i]
+            # Within a key run doc ids ascend: jump to the shard's first id,
+            # or past the run once beyond the shard.
+            if doc_id < docs.start:
+                i = bisect_left(base, (key, docs.start), i)
+                continue
+            if doc_id >= docs.stop:
+                i = bisect_left(base, (key, math.inf), i)
+                continue
+            i += 1
+            if doc_id in overlaps or doc_id in deleted:
+                continue
+            ordered = sign * self._score(q_sq, q_l1, doc_id, 0.0)
+            if len(extra) < top_k:
+                heapq.heappush(extra, (-ordered, -doc_id))
+                continue
+            worst, worst_id = -extra[0][0], -extra[0][1]
+            if ordered > worst:
+                break
+            if ordered < worst or doc_id < worst_id:
+                heapq.heapreplace(extra, (-ordered, -doc_id))
+            else:
+                i = bisect_left(base, (key, math.inf), i)
+        candidates = ranked + [(-o * sign, -d) for o, d in extra]
+        return [(score, d, self.corpus[d])
+                for score, d in _top_k(candidates, top_k, self.higher_is_better)]
+
+    # -- NumPy batch engine ------------------------------------------------
+
+    def _dense(self):
+        """
+        Lazily materialise the documents as one contiguous float32 matrix
+        (N x |vocab|) together with their L2 norms and squared norms.
+        It is rebuilt on the first batch after the index changes.
+        """
+        if self._matrix_generation != self.index.generation:
+            if np is None:
+                raise ImportError("search_batch requires numpy")
+            matrix = np.zeros((len(self.corpus), len(self.vocab)), dtype=np.float32)
+            index = self.index
+            indptr = np.asarray(index.indptr, dtype=np.int64)
+            rows = np.repeat(np.arange(len(self.corpus)), np.diff(indptr))
+            matrix[rows, np.asarray(index.indices, dtype=np.int64)] = np.asarray(index.weights)
+            self._matrix = matrix
+            self._sq_norms32 = np.einsum("ij,ij->i", matrix, matrix)
+            self._norms32 = np.sqrt(self._sq_norms32)
+            self._deleted_ids = np.fromiter(sorted(index.deleted), dtype=np.int64)
+            self._matrix_generation = index.generation
+        return self._matrix
+
+    def _query_matrix(self, queries: List[str]):
+        q = np.zeros((len(queries), len(self.vocab)), dtype=np.float32)
+        for row, query in enumerate(queries):
+            ids, weights = self._query_vector(preprocess(query))
+            q[row, ids] = weights
+        return q
+
+    def _batch_scores(self, q, rows: slice):
+        """Return the (n_queries x len(rows)) score matrix for a dense query block."""
+        raise NotImplementedError
+
+    def search_batch(self, queries: List[str], top_k: int = 3, batch_size: int = 256,
+                     doc_range: Optional[Tuple[int, int]] = None) -> List[List[Tuple[float, str]]]:
+        """
+        Score many queries at once with NumPy over the float32 document
+        matrix, ``batch_size`` queries per block, selecting each top-k with
+        ``argpartition``. Scores are float32, so values can differ from
+        :meth:`search` in the last digits; ties (also at the k-th place) go
+        to the lower doc id. ``doc_range`` restricts scoring to those
+        matrix rows.
+        """
+        return [[(score, self.corpus[d]) for score, d in row]
+                for row in self._search_batch_ids(queries, top_k, batch_size, doc_range)]
+
+    def _search_batch_ids(self, queries: List[str], top_k: int, batch_size: int,
+                          doc_range: Optional[Tuple[int, int]]) -> List[List[Tuple[float, int]]]:
+        self._dense()
+        docs = _doc_range(self.index, doc_range)
+        rows = slice(docs.start, docs.stop)
+        deleted = self._deleted_ids[(self._deleted_ids >= docs.start) & (self._deleted_ids < docs.stop)]
+        k = min(top_k, len(docs) - len(deleted))
+        results: List[List[Tuple[float, int]]] = []
+        for start in range(0, len(queries), batch_size):
+            scores = self._batch_scores(self._query_matrix(queries[start:start + batch_size]), rows)
+            if k <= 0:
+                results.extend([] for _ in range(len(scores)))
+                continue
+            keyed = -scores if self.higher_is_better else scores
+            keyed[:, deleted - docs.start] = np.inf
+            kth = np.partition(keyed, k - 1, axis=1)[:, k - 1]
+            for row, bound in enumerate(kth):
+                # Everything strictly better than the k-th key, then the
+                # lowest doc ids among those tied with it.
+                better = np.flatnonzero(keyed[row] < bound)
+                tied = np.flatnonzero(keyed[row] == bound)[:k - len(better)]
+                top = np.concatenate([better, tied])
+                top = top[np.lexsort((top, keyed[row, top]))]
+                results.append([(float(scores[row, d]), docs.start + int(d)) for d in top])
+        return results
+
+    def _exact_scores(self, q_ids: List[int], q_weights: List[float],
+                      doc_ids: Iterable[int]) -> List[Tuple[float, int]]:
+        """(score, doc_id) exactly as :meth:`search` computes it, for given documents."""
+        index = self.index
+        indptr, indices, weights = index.indptr, index.indices, index.weights
+        q_sq = sum(w ** 2 for w in q_weights)
+        q_l1 = sum(q_weights)
+        scored = []
+        for doc_id in doc_ids:
+            start, end = indptr[doc_id], indptr[doc_id + 1]
+            overlap = 0.0
+            for term_id, q_w in zip(q_ids, q_weights):
+                pos = bisect_left(indices, term_id, start, end)
+                if pos < end and indices[pos] == term_id:
+                    overlap += self._overlap_term(q_w, weights[pos])
+            scored.append((self._score(q_sq, q_l1, doc_id, overlap), doc_id))
+        return scored
+
+    # -- approximate nearest neighbours -------------------------------------
+
+    def build_ann(self, **params) -> "IVFIndex":
+        """
+        Build (or rebuild) the :class:`IVFIndex` used by
+        :meth:`search_approximate`; ``params`` are its constructor knobs.
+        """
+        self._ann_params = params
+        self._ann = IVFIndex(self, **params)
+        self._ann_synced = (self.index.epoch, len(self.corpus))
+        return self._ann
+
+    def _sync_ann(self) -> "IVFIndex":
+        """
+        Build the ANN index on first use, file documents added since into
+        it, and rebuild it after a compaction renumbered the documents.
+        """
+        epoch, n_docs = self.index.epoch, len(self.corpus)
+        if self._ann is None or self._ann_synced[0] != epoch or not self._ann_synced[1]:
+            self.build_ann(**self._ann_params)
+        elif self._ann_synced[1] < n_docs:
+            self._ann.add(np.arange(self._ann_synced[1], n_docs))
+            self._ann_synced = (epoch, n_docs)
+        return self._ann
+
+    def search_approximate(self, query: str, top_k: int = 3, n_probe: int = 8,
+                           rerank: bool = True, rerank_factor: int = 4) -> List[Tuple[float, str]]:
+        """
+        Approximate search through the IVF index (built on first use).
+
+        Only the ``n_probe`` nearest clusters are scanned; more probes raise
+        recall and latency. With ``rerank`` the best ``rerank_factor * top_k``
+        candidates are rescored exactly, so returned scores equal
+        :meth:`search`'s; otherwise the float32 (or PQ) estimates are used.
+        """
+        return [(score, self.corpus[d]) for score, d in
+                self._search_approximate_ids(query, top_k, n_probe, rerank, rerank_factor)]
+
+    def _search_approximate_ids(self, query: str, top_k: int, n_probe: int, rerank: bool,
+                                rerank_factor: int) -> List[Tuple[float, int]]:
+        if top_k <= 0:
+            return []
+        ann = self._sync_ann()
+        q_ids, q_weights = self._query_vector(preprocess(query))
+        q = np.zeros((1, max(ann.width, len(self.vocab))), dtype=np.float32)
+        q[0, q_ids] = q_weights
+        n_candidates = top_k * rerank_factor if rerank else top_k
+        estimates, doc_ids = ann.candidates(q, n_probe, n_candidates)
+        if rerank:
+            return _top_k(self._exact_scores(q_ids, q_weights, doc_ids.tolist()),
+                          top_k, self.higher_is_better)
+        return [(ann.to_score(e), d) for e, d in zip(estimates.tolist(), doc_ids.tolist())]
+
+    def recall_at_k(self, queries: List[str], k: int = 10, n_probe: int = 8,
+                    rerank: bool = True, rerank_factor: int = 4) -> Dict[str, float]:
+        """
+        Compare :meth:`search_approximate` with the exact search on
+        ``queries``: mean recall@k of the returned doc ids and mean / p99
+        latency (milliseconds) of both paths.
+        """
+        self._sync_ann()
+        recalls, exact_ms, approx_ms = [], [], []
+        for query in queries:
+            t0 = time.perf_counter()
+            exact = self._search_tokens(preprocess(query), k, None)
+            t1 = time.perf_counter()
+            approx = self._search_approximate_ids(query, k, n_probe, rerank, rerank_factor)
+            t2 = time.perf_counter()
+            exact_ms.append((t1 - t0) * 1000)
+            approx_ms.append((t2 - t1) * 1000)
+            if exact:
+                found = {d for _, d in approx}
+                recalls.append(sum(d in found for _, d, _ in exact) / len(exact))
+        return {
+            "k": k, "n_probe": n_probe, "queries": len(queries),
+            "recall": sum(recalls) / len(recalls) if recalls else 1.0,
+            "exact_ms": sum(exact_ms) / len(exact_ms) if exact_ms else 0.0,
+            "exact_p99_ms": _percentile(exact_ms, 99),
+            "approx_ms": sum(approx_ms) / len(approx_ms) if approx_ms else 0.0,
+            "approx_p99_ms": _percentile(approx_ms, 99),
+        }
+
+
 # ===========================================================================
 # 1. COSINE SIMILARITY SEARCH
 # ===========================================================================
 
-class CosineSimilaritySearch:
+class CosineSimilaritySearch(_SparseVectorSearch):
     """
     Measures the cosine of the angle between two vectors.
     Score = 1.0 means identical direction (most similar).
@@ -53,69 +1091,64 @@ class CosineSimilaritySearch:
 
     Formula:
         cosine(A, B) = (A . B) / (||A|| x ||B||)
+
+    Only terms shared with the query contribute to A . B.
     """
 
-    def __init__(self, corpus: List[str]):
-        self.corpus = corpus
-        self.vocab = build_vocab(corpus)
-        self.doc_vectors = [
-            build_tfidf_vector(preprocess(doc), self.vocab)
-            for doc in corpus
-        ]
+    higher_is_better = True
+    _ann_metric = "ip"  # IVFIndex compares unit vectors by dot product
 
-    def _cosine(self, a: List[float], b: List[float]) -> float:
-        dot = sum(x * y for x, y in zip(a, b))
-        mag_a = math.sqrt(sum(x ** 2 for x in a))
-        mag_b = math.sqrt(sum(x ** 2 for x in b))
-        return dot / (mag_a * mag_b) if mag_a and mag_b else 0.0
-
-    def search(self, query: str, top_k: int = 3) -> List[Tuple[float, str]]:
-        q_vec = build_tfidf_vector(preprocess(query), self.vocab)
-        scores = [
-            (self._cosine(q_vec, doc_vec), doc)
-            for doc_vec, doc in zip(self.doc_vectors, self.corpus)
-        ]
-        return sorted(scores, reverse=True)[:top_k]
+    def _overlap_term(self, q: float, d: float) -> float:
+        return q * d
+
+    def _score(self, q_sq: float, q_l1: float, doc_id: int, overlap: float) -> float:
+        mag_q = math.sqrt(q_sq)
+        mag_d = math.sqrt(self.sq_norms[doc_id])
+        return overlap / (mag_q * mag_d) if mag_q and mag_d else 0.0
+
+    def _batch_scores(self, q, rows: slice):
+        q_norms = np.linalg.norm(q, axis=1)
+        denom = q_norms[:, None] * self._norms32[None, rows]
+        dots = q @ self._matrix[rows].T
+        return np.divide(dots, denom, out=np.zeros_like(dots), where=denom > 0)
 
 
 # ===========================================================================
 # 2. EUCLIDEAN DISTANCE SEARCH
 # ===========================================================================
 
-class EuclideanDistanceSearch:
+class EuclideanDistanceSearch(_SparseVectorSearch):
     """
     Measures straight-line distance between two vectors in n-dimensional space.
     Lower distance = more similar documents.
 
     Formula:
         euclidean(A, B) = sqrt(Sum (a_i - b_i)^2)
+                        = sqrt(||A||^2 + ||B||^2 - 2 A . B)
     """
 
-    def __init__(self, corpus: List[str]):
-        self.corpus = corpus
-        self.vocab = build_vocab(corpus)
-        self.doc_vectors = [
-            build_tfidf_vector(preprocess(doc), self.vocab)
-            for doc in corpus
-        ]
+    _ann_metric = "l2"
 
-    def _euclidean(self, a: List[float], b: List[float]) -> float:
-        return math.sqrt(sum((x - y) ** 2 for x, y in zip(a, b)))
+    def _base_key(self, doc_id: int) -> float:
+        return self.sq_norms[doc_id]
 
-    def search(self, query: str, top_k: int = 3) -> List[Tuple[float, str]]:
-        q_vec = build_tfidf_vector(preprocess(query), self.vocab)
-        scores = [
-            (self._euclidean(q_vec, doc_vec), doc)
-            for doc_vec, doc in zip(self.doc_vectors, self.corpus)
-        ]
-        return sorted(scores)[:top_k]
+    def _overlap_term(self, q: float, d: float) -> float:
+        return q * d
+
+    def _score(self, q_sq: float, q_l1: float, doc_id: int, overlap: float) -> float:
+        return math.sqrt(max(0.0, q_sq + self.sq_norms[doc_id] - 2 * overlap))
+
+    def _batch_scores(self, q, rows: slice):
+        q_sq = np.einsum("ij,ij->i", q, q)
+        sq = q_sq[:, None] + self._sq_norms32[None, rows] - 2 * (q @ self._matrix[rows].T)
+        return np.sqrt(np.maximum(sq, 0.0))
 
 
 # ===========================================================================
 # 3. MANHATTAN DISTANCE SEARCH
 # ===========================================================================
 
-class ManhattanDistanceSearch:
+class ManhattanDistanceSearch(_SparseVectorSearch):
     """
     Also known as L1 distance or taxicab distance.
     Sum of absolute differences between vector components.
@@ -123,26 +1156,427 @@ class ManhattanDistanceSearch:
 
     Formula:
         manhattan(A, B) = Sum |a_i - b_i|
+                        = ||A||_1 + ||B||_1 + Sum_shared (|a_i - b_i| - a_i - b_i)
     """
 
-    def __init__(self, corpus: List[str]):
-        self.corpus = corpus
-        self.vocab = build_vocab(corpus)
-        self.doc_vectors = [
-            build_tfidf_vector(preprocess(doc), self.vocab)
-            for doc in corpus
-        ]
+    _ann_metric = "l1"
 
-    def _manhattan(self, a: List[float], b: List[float]) -> float:
-        return sum(abs(x - y) for x, y in zip(a, b))
+    def _base_key(self, doc_id: int) -> float:
+        return self.l1_norms[doc_id]
 
-    def search(self, query: str, top_k: int = 3) -> List[Tuple[float, str]]:
-        q_vec = build_tfidf_vector(preprocess(query), self.vocab)
-        scores = [
-            (self._manhattan(q_vec, doc_vec), doc)
-            for doc_vec, doc in zip(self.doc_vectors, self.corpus)
-        ]
-        return sorted(scores)[:top_k]
+    def _overlap_term(self, q: float, d: float) -> float:
+        return abs(q - d) - q - d
+
+    def _score(self, q_sq: float, q_l1: float, doc_id: int, overlap: float) -> float:
+        return max(0.0, q_l1 + self.l1_norms[doc_id] + overlap)
+
+    _L1_BLOCK_ELEMENTS = _L1_BLOCK_ELEMENTS
+
+    def _batch_scores(self, q, rows: slice):
+        matrix = self._matrix[rows]
+        out = np.empty((len(q), len(matrix)), dtype=np.float32)
+        step = max(1, self._L1_BLOCK_ELEMENTS // max(1, len(q) * matrix.shape[1]))
+        for start in range(0, len(matrix), step):
+            block = matrix[start:start + step]
+            out[:, start:start + step] = np.abs(q[:, None, :] - block[None, :, :]).sum(axis=2)
+        return out
+
+
+# ===========================================================================
+# APPROXIMATE NEAREST NEIGHBOURS (IVF + PQ) FOR THE VECTOR SEARCHES
+# ===========================================================================
+
+class IVFIndex:
+    """
+    Inverted-file ANN index with optional product quantization, in the
+    metric of the vector search it is built for: dot product of unit
+    vectors (cosine), squared L2 (Euclidean) or L1 (Manhattan).
+
+    k-means on a sample of ``train_size`` documents (by default 50 per
+    centroid, capped at a 128 MB dense sample) gives ``n_lists``
+    coarse centroids; every document is filed under the one nearest in the
+    search's metric. Documents are only ever densified in bounded chunks.
+    Without PQ each list keeps its documents as sparse float32 rows (CSR),
+    so memory follows the number of postings, not N x |vocab|; with
+    ``pq_subspaces = m`` each document's residual from its centroid is cut
+    into m slices, each encoded as the (L2-)nearest of 2**pq_bits
+    codewords, and scanned through lookup tables (all three metrics add up
+    across slices). Stored arrays are laid out list by list, so a probe
+    reads contiguous memory.
+
+    PQ only buys memory: a document costs ``pq_subspaces`` bytes instead of
+    8 per distinct term, so it pays off for long documents (more than
+    ``pq_subspaces / 8`` distinct terms on average) when the sparse lists
+    do not fit. For short TF vectors it is both less accurate and slower:
+    on a 20k-document topical corpus recall@10 stayed between 0.4 and 0.7
+    with the default ``rerank_factor`` against 0.9-0.98 without PQ, and
+    since L2 / L1 tables are rebuilt for every probed list, latency there
+    exceeded the exact search from ``n_probe = 4``. With PQ, raise
+    ``rerank_factor`` rather than ``n_probe`` (16 brought that corpus to
+    0.95).
+
+    :meth:`add` files new documents under the existing centroids into small
+    delta blocks scanned alongside the main one. Deltas are consolidated
+    once there are more than ``MAX_DELTAS`` of them and folded into the
+    main block once they hold an eighth of its documents, so adding costs
+    amortised time per new document and k-means never runs again. Deleted
+    documents are skipped at query time; a compaction renumbers documents,
+    so the search rebuilds the index then.
+    """
+
+    MAX_DELTAS = 8
+
+    def __init__(self, search: _SparseVectorSearch, n_lists: Optional[int] = None,
+                 pq_subspaces: int = 0, pq_bits: int = 8, train_size: Optional[int] = None,
+                 n_iter: int = 10, seed: int = 1):
+        if np is None:
+            raise ImportError("IVFIndex requires numpy")
+        self.search = search
+        self.metric = search._ann_metric
+        n_docs = len(search.corpus)
+        self.n_lists = max(1, min(n_docs, n_lists or int(math.sqrt(n_docs))))
+        self.pq_subspaces = pq_subspaces
+        self.pq_bits = pq_bits
+        dim = len(search.vocab)
+        self.width = -(-dim // pq_subspaces) * pq_subspaces if pq_subspaces else dim
+        rng = np.random.default_rng(seed)
+        self.n_docs = n_docs
+        self._live_state: Optional[Tuple[int, int]] = None
+        if n_docs == 0:
+            # Nothing to train on: one empty list; the search rebuilds once documents arrive.
+            self.centroids = np.zeros((1, self.width), dtype=np.float32)
+            if pq_subspaces:
+                self.codebooks = np.zeros((pq_subspaces, 1 << pq_bits, self.width // pq_subspaces),
+                                          dtype=np.float32)
+            self.blocks = [self._encode(np.arange(0))]
+            return
+
+        if train_size is None:
+            # 50 points per list, within a 128 MB dense training sample.
+            train_size = max(1, min(50 * max(self.n_lists, 1 << pq_bits if pq_subspaces else 1),
+                                    (1 << 25) // max(1, self.width)))
+        sample = np.sort(rng.choice(n_docs, min(n_docs, train_size), replace=False))
+        indptr, indices, values, _ = self._sparse(sample)
+        train = self._densify(indptr, indices, values, 0, len(sample))
+        self.centroids = _kmeans(train, self.n_lists, n_iter, rng, normalize=self.metric == "ip")
+        if pq_subspaces:
+            sub = self.width // pq_subspaces
+            train -= self.centroids[_nearest(train, self.centroids, self.metric)]
+            self.codebooks = np.stack([
+                _kmeans(np.ascontiguousarray(train[:, j * sub:(j + 1) * sub]), 1 << pq_bits, n_iter,
+                        rng, pad_to=1 << pq_bits)
+                for j in range(pq_subspaces)
+            ])
+        del train
+        self.blocks: List[_IVFBlock] = [self._encode(np.arange(n_docs))]
+
+    def add(self, doc_ids) -> None:
+        """File documents ``doc_ids`` (appended to the index since) under their nearest centroid."""
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        if not len(doc_ids):
+            return
+        self.blocks.append(self._encode(doc_ids))
+        self.n_docs = max(self.n_docs, int(doc_ids.max()) + 1)
+        main, deltas = self.blocks[0], self.blocks[1:]
+        if 8 * sum(len(b) for b in deltas) >= len(main):
+            self.blocks = [_IVFBlock.concat(self.n_lists, self.blocks)]
+        elif len(deltas) > self.MAX_DELTAS:
+            self.blocks = [main, _IVFBlock.concat(self.n_lists, deltas)]
+
+    def _sparse(self, doc_ids):
+        """
+        Rows ``doc_ids`` of the search's TF matrix as CSR in index space
+        (unit length for cosine), with every row's squared norm.
+        """
+        index = self.search.index
+        indptr, pos = _csr_take(_np_view(index.indptr, np.int64), doc_ids)
+        indices = _np_view(index.indices, np.int64)[pos]
+        values = _np_view(index.weights, np.float64)[pos]
+        sq_norms = _segment_sums(values * values, indptr)
+        if self.metric == "ip":
+            norms = np.sqrt(sq_norms)
+            scale = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+            values = values * np.repeat(scale, np.diff(indptr))
+            sq_norms = (norms > 0).astype(np.float64)
+        return indptr, indices, values.astype(np.float32), sq_norms
+
+    def _densify(self, indptr, indices, values, lo: int, hi: int):
+        """Dense float32 rows ``lo:hi`` of a CSR block, dropping terms beyond ``width``."""
+        out = np.zeros((hi - lo, self.width), dtype=np.float32)
+        a, b = indptr[lo], indptr[hi]
+        rows = np.repeat(np.arange(hi - lo), np.diff(indptr[lo:hi + 1]))
+        cols = indices[a:b]
+        keep = cols < self.width
+        out[rows[keep], cols[keep]] = values[a:b][keep]
+        return out
+
+    def _encode(self, doc_ids) -> "_IVFBlock":
+        """Assign ``doc_ids`` to lists from their sparse rows (and PQ-encode them)."""
+        indptr, indices, values, sq_norms = self._sparse(doc_ids)
+        n = len(doc_ids)
+        codes = (np.empty((n, self.pq_subspaces), dtype=np.uint8 if self.pq_bits <= 8 else np.uint16)
+                 if self.pq_subspaces else None)
+        lists = self._nearest_sparse(indptr, indices, values, 0, n)
+        if codes is not None:
+            # The residuals from the centroids are dense, so PQ works in bounded chunks.
+            sub = self.width // self.pq_subspaces
+            chunk = max(1, (1 << 22) // max(1, self.width))
+            for start in range(0, n, chunk):
+                stop = min(start + chunk, n)
+                x = self._densify(indptr, indices, values, start, stop)
+                x -= self.centroids[lists[start:stop]]
+                for j in range(self.pq_subspaces):
+                    codes[start:stop, j] = _nearest(np.ascontiguousarray(x[:, j * sub:(j + 1) * sub]),
+                                                    self.codebooks[j], "l2")
+        if codes is not None:
+            return _IVFBlock(self.n_lists, lists, doc_ids, codes=codes)
+        return _IVFBlock(self.n_lists, lists, doc_ids, indptr=indptr,
+                         indices=indices.astype(np.int32), values=values, sq_norms=sq_norms)
+
+    def _nearest_sparse(self, indptr, indices, values, lo: int, hi: int):
+        """
+        Nearest centroid for the sparse rows ``lo:hi``. Every distance is a
+        per-centroid constant plus a sum over the row's terms only:
+        -x.c for the dot product, |c|^2 - 2 x.c for squared L2 (|x|^2 is the
+        same for every centroid) and |c|_1 + sum(|x_j - c_j| - |c_j|) for L1,
+        so the cost follows the rows' nonzeros rather than the vocabulary.
+        Terms added after training are zero in every centroid and skipped.
+        """
+        if not hasattr(self, "_centroid_base"):
+            if self.metric == "ip":
+                self._centroid_base = np.zeros(self.n_lists)
+            elif self.metric == "l2":
+                self._centroid_base = np.einsum("ij,ij->i", self.centroids, self.centroids,
+                                                dtype=np.float64)
+            else:
+                self._centroid_base = np.abs(self.centroids).sum(axis=1, dtype=np.float64)
+        step = max(1, (1 << 22) // self.n_lists)  # 32 MB of float64 per temporary
+        out = np.empty(hi - lo, dtype=np.int64)
+        row = lo
+        while row < hi:
+            # Grow the block row by row until it holds ``step`` nonzeros.
+            end = min(hi, max(row + 1, int(np.searchsorted(indptr, indptr[row] + step, "right")) - 1))
+            a, b = indptr[row], indptr[end]
+            cols, x = indices[a:b], values[a:b]
+            keep = cols < self.width
+            c = self.centroids[:, cols[keep]]
+            delta = np.zeros((self.n_lists, b - a))
+            if self.metric == "l1":
+                delta[:, keep] = np.abs(x[keep] - c) - np.abs(c)
+            else:
+                delta[:, keep] = c * (-2 * x[keep] if self.metric == "l2" else -x[keep])
+            ptr = indptr[row:end + 1] - a
+            cumulative = np.zeros((self.n_lists, b - a + 1))
+            np.cumsum(delta, axis=1, out=cumulative[:, 1:])
+            dist = self._centroid_base[:, None] + cumulative[:, ptr[1:]] - cumulative[:, ptr[:-1]]
+            out[row - lo:end - lo] = dist.argmin(axis=0)
+            row = end
+        return out
+
+    def _prepare(self, x):
+        """Map TF rows into the index space (unit length for cosine)."""
+        if self.metric == "ip":
+            norms = np.linalg.norm(x, axis=1, keepdims=True)
+            np.divide(x, norms, out=x, where=norms > 0)
+        return x
+
+    def _live(self):
+        index = self.search.index
+        state = (index.generation, self.n_docs)
+        if self._live_state != state:
+            self._live_mask = np.ones(self.n_docs, dtype=bool)
+            deleted = [d for d in index.deleted if d < self.n_docs]
+            self._live_mask[deleted] = False
+            self._live_state = state
+        return self._live_mask
+
+    def candidates(self, q, n_probe: int, n_candidates: int):
+        """
+        Nearest ``n_candidates`` live documents to the query among the
+        ``n_probe`` nearest lists: (estimated distances, doc ids), nearest
+        first. ``q`` is (1 x d) with d at least ``width`` and the current
+        vocabulary size.
+        """
+        q = self._prepare(q.copy())
+        q_head = q[:, :self.width]
+        n_probe = min(n_probe, self.n_lists)
+        centroid_dist = _ann_distances(q_head, self.centroids, self.metric)[0]
+        probe = np.argpartition(centroid_dist, n_probe - 1)[:n_probe]
+        # With PQ: -q.(c + r) = -q.c - q.r, while the L2 / L1 distance of q
+        # to c + r is that of q - c to r, so those tables are built per list.
+        pq = self.pq_subspaces > 0
+        ip_tables = self._pq_tables(q_head) if pq and self.metric == "ip" else None
+        q_row = q[0].astype(np.float64)
+        q_sq, q_l1 = float(q_row @ q_row), float(np.abs(q_row).sum())
+        parts, spans = [], []
+        for l in probe:
+            tables = None
+            for block in self.blocks:
+                lo, hi = block.offsets[l], block.offsets[l + 1]
+                if lo == hi:
+                    continue
+                spans.append(block.doc_ids[lo:hi])
+                if not pq:
+                    parts.append(self._sparse_distances(block, lo, hi, q_row, q_sq, q_l1))
+                elif self.metric == "ip":
+                    parts.append(self._pq_lookup(ip_tables, block.codes[lo:hi]) + centroid_dist[l])
+                else:
+                    if tables is None:
+                        tables = self._pq_tables(q_head - self.centroids[l])
+                    parts.append(self._pq_lookup(tables, block.codes[lo:hi]))
+        if not parts:
+            return np.empty(0), np.empty(0, dtype=np.int64)
+        estimates, doc_ids = np.concatenate(parts), np.concatenate(spans)
+        live = self._live()[doc_ids]
+        estimates, doc_ids = estimates[live], doc_ids[live]
+        k = min(n_candidates, len(doc_ids))
+        if k == 0:
+            return estimates[:0], doc_ids[:0]
+        top = np.argpartition(estimates, k - 1)[:k]
+        top = top[np.lexsort((doc_ids[top], estimates[top]))]
+        return estimates[top], doc_ids[top]
+
+    def _sparse_distances(self, block: "_IVFBlock", lo: int, hi: int, q, q_sq: float, q_l1: float):
+        """Exact distances of the query to the sparse rows ``lo:hi`` of ``block``."""
+        a, b = block.indptr[lo], block.indptr[hi]
+        ptr = block.indptr[lo:hi + 1] - a
+        x = block.values[a:b]
+        qx = q[block.indices[a:b]]
+        if self.metric == "l1":
+            # |q - x|_1 = |q|_1 + sum over the row's terms of (|q_j - x_j| - |q_j|)
+            return q_l1 + _segment_sums(np.abs(qx - x) - np.abs(qx), ptr)
+        dots = _segment_sums(qx * x, ptr)
+        if self.metric == "ip":
+            return -dots
+        return q_sq + block.sq_norms[lo:hi] - 2 * dots
+
+    def _pq_tables(self, q):
+        """(m x 2**pq_bits) distances of each query slice to its codewords."""
+        sub = self.width // self.pq_subspaces
+        return np.stack([_ann_distances(q[:, j * sub:(j + 1) * sub], self.codebooks[j], self.metric)[0]
+                         for j in range(self.pq_subspaces)])
+
+    def _pq_lookup(self, tables, codes):
+        return tables[np.arange(self.pq_subspaces), codes].sum(axis=1)
+
+    def to_score(self, estimate: float) -> float:
+        """Turn an estimated distance into the search's score scale."""
+        if self.metric == "ip":
+            return -estimate
+        if self.metric == "l2":
+            return math.sqrt(max(estimate, 0.0))
+        return estimate
+
+
+class _IVFBlock:
+    """
+    Documents of an :class:`IVFIndex` grouped by list: list ``l`` is
+    ``doc_ids[offsets[l]:offsets[l + 1]]`` together with the same rows of
+    ``codes`` (PQ) or of the CSR arrays ``indptr``/``indices``/``values``.
+    """
+
+    def __init__(self, n_lists: int, lists, doc_ids, codes=None, indptr=None,
+                 indices=None, values=None, sq_norms=None):
+        order = np.argsort(lists, kind="stable")
+        self.lists = lists[order]
+        self.doc_ids = np.asarray(doc_ids, dtype=np.int64)[order]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(lists, minlength=n_lists))])
+        self.codes = codes[order] if codes is not None else None
+        if indptr is not None:
+            self.indptr, pos = _csr_take(indptr, order)
+            self.indices, self.values = indices[pos], values[pos]
+            self.sq_norms = sq_norms[order]
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    @classmethod
+    def concat(cls, n_lists: int, blocks: List["_IVFBlock"]) -> "_IVFBlock":
+        lists = np.concatenate([b.lists for b in blocks])
+        doc_ids = np.concatenate([b.doc_ids for b in blocks])
+        if blocks[0].codes is not None:
+            return cls(n_lists, lists, doc_ids, codes=np.concatenate([b.codes for b in blocks]))
+        shifts = np.cumsum([0] + [b.indptr[-1] for b in blocks[:-1]])
+        indptr = np.concatenate([blocks[0].indptr[:1]] +
+                                [b.indptr[1:] + shift for b, shift in zip(blocks, shifts)])
+        return cls(n_lists, lists, doc_ids, indptr=indptr,
+                   indices=np.concatenate([b.indices for b in blocks]),
+                   values=np.concatenate([b.values for b in blocks]),
+                   sq_norms=np.concatenate([b.sq_norms for b in blocks]))
+
+
+def _np_view(buffer, dtype):
+    """Zero-copy NumPy view of an ``array`` / memoryview (do not keep it across writes)."""
+    return np.frombuffer(buffer, dtype=dtype)
+
+
+def _csr_take(indptr, rows):
+    """
+    Gather CSR ``rows``: returns the new indptr and the positions of their
+    entries in the old data arrays.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    new_indptr = np.concatenate([[0], np.cumsum(lengths)])
+    pos = np.arange(new_indptr[-1]) - np.repeat(new_indptr[:-1] - starts, lengths)
+    return new_indptr, pos
+
+
+def _segment_sums(x, indptr):
+    """Per-row sums of CSR data ``x`` (empty rows give 0)."""
+    cumulative = np.concatenate([[0.0], np.cumsum(x, dtype=np.float64)])
+    return cumulative[indptr[1:]] - cumulative[indptr[:-1]]
+
+
+def _ann_distances(x, c, metric: str):
+    """(len(x) x len(c)) distances, lower is nearer: -dot, squared L2 or L1."""
+    if metric == "ip":
+        return -(x @ c.T)
+    if metric == "l2":
+        return (np.einsum("ij,ij->i", x, x)[:, None] + np.einsum("ij,ij->i", c, c)[None, :]
+                - 2 * (x @ c.T))
+    out = np.empty((len(x), len(c)), dtype=np.float32)
+    step = max(1, _L1_BLOCK_ELEMENTS // max(1, len(x) * c.shape[1]))
+    for start in range(0, len(c), step):
+        out[:, start:start + step] = np.abs(x[:, None, :] - c[None, start:start + step, :]).sum(axis=2)
+    return out
+
+
+def _nearest(x, c, metric: str):
+    """Index of the nearest row of ``c`` for every row of ``x``, in bounded-memory chunks."""
+    chunk = max(1, _L1_BLOCK_ELEMENTS // max(1, len(c) * (c.shape[1] if metric == "l1" else 1)))
+    return np.concatenate([_ann_distances(x[i:i + chunk], c, metric).argmin(axis=1)
+                           for i in range(0, len(x), chunk)] or [np.empty(0, dtype=np.int64)])
+
+
+def _kmeans(x, k: int, n_iter: int, rng, normalize: bool = False, pad_to: Optional[int] = None):
+    """
+    Lloyd's k-means (unit-length centroids with ``normalize``). Returns k
+    centroids, or ``pad_to`` rows when fewer points than that were given
+    (the extra rows repeat the last centroid).
+    """
+    k = max(1, min(k, len(x)))
+    centroids = x[rng.choice(len(x), k, replace=False)].copy()
+    labels = None
+    for _ in range(n_iter):
+        new = _nearest(x, centroids, "l2")
+        if labels is not None and np.array_equal(new, labels):
+            break
+        labels = new
+        counts = np.bincount(labels, minlength=k)
+        nonempty = counts > 0
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        sums = np.add.reduceat(x[np.argsort(labels, kind="stable")], starts[nonempty])
+        centroids[nonempty] = sums / counts[nonempty, None]
+        empty = np.flatnonzero(~nonempty)
+        centroids[empty] = x[rng.integers(len(x), size=len(empty))]
+        if normalize:
+            norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+            np.divide(centroids, norms, out=centroids, where=norms > 0)
+    if pad_to is not None and len(centroids) < pad_to:
+        centroids = np.concatenate([centroids, np.repeat(centroids[-1:], pad_to - len(centroids), axis=0)])
+    return centroids
 
 
 # ===========================================================================
@@ -159,22 +1593,159 @@ class JaccardSimilaritySearch:
         jaccard(A, B) = |A intersect B| / |A union B|
     """
 
-    def __init__(self, corpus: List[str]):
-        self.corpus = corpus
-        self.doc_sets = [set(preprocess(doc)) for doc in corpus]
+    higher_is_better = True
+
+    def __init__(self, corpus: Union[List[str], CorpusIndex],
+                 num_bands: int = 16, rows_per_band: int = 4, seed: int = 1,
+                 cache: Optional[QueryCache] = None):
+        self.index = _as_index(corpus)
+        self.cache = cache
+        self.num_bands = num_bands
+        self.rows_per_band = rows_per_band
+        self.seed = seed
+        self._lsh: Optional[MinHashLSH] = None
+        self._lsh_synced: Optional[Tuple[int, int]] = None
+
+    @property
+    def corpus(self) -> List[str]:
+        return self.index.corpus
+
+    @property
+    def doc_sets(self) -> List[frozenset]:
+        return self.index.token_sets
 
     def _jaccard(self, set_a: set, set_b: set) -> float:
         intersection = len(set_a & set_b)
         union = len(set_a | set_b)
         return intersection / union if union else 0.0
 
-    def search(self, query: str, top_k: int = 3) -> List[Tuple[float, str]]:
+    def search(self, query: str, top_k: int = 3,
+               doc_range: Optional[Tuple[int, int]] = None) -> List[Tuple[float, str]]:
+        return [(score, doc) for score, _, doc in self.search_with_ids(query, top_k, doc_range)]
+
+    def search_with_ids(self, query: str, top_k: int = 3,
+                        doc_range: Optional[Tuple[int, int]] = None) -> List[Tuple[float, int, str]]:
+        """Like :meth:`search` but returns (score, doc_id, doc); ties go to the lower doc id."""
+        if top_k <= 0:
+            return []
         q_set = set(preprocess(query))
-        scores = [
-            (self._jaccard(q_set, doc_set), doc)
-            for doc_set, doc in zip(self.doc_sets, self.corpus)
-        ]
-        return sorted(scores, reverse=True)[:top_k]
+        return _cached_search(self, (), sorted(q_set), top_k, doc_range,
+                              lambda: self._search_set(q_set, top_k, doc_range))
+
+    def _search_set(self, q_set: set, top_k: int,
+                    doc_range: Optional[Tuple[int, int]]) -> List[Tuple[float, int, str]]:
+        deleted, doc_sets = self.index.deleted, self.doc_sets
+        scores = ((self._jaccard(q_set, doc_sets[doc_id]), doc_id)
+                  for doc_id in _doc_range(self.index, doc_range) if doc_id not in deleted)
+        return [(score, d, self.corpus[d]) for score, d in _top_k(scores, top_k, True)]
+
+    def _sync_lsh(self) -> MinHashLSH:
+        """Build the LSH index on first use, then add new documents to it."""
+        epoch, n_docs = self.index.epoch, len(self.corpus)
+        if self._lsh is None or self._lsh_synced[0] != epoch:
+            self._lsh = MinHashLSH(self.doc_sets, self.num_bands, self.rows_per_band, self.seed)
+        else:
+            for doc_id in range(self._lsh_synced[1], n_docs):
+                self._lsh.add(doc_id, self.doc_sets[doc_id])
+        self._lsh_synced = (epoch, n_docs)
+        return self._lsh
+
+    def search_approximate(self, query: str, top_k: int = 3,
+                           rerank: bool = True) -> List[Tuple[float, str]]:
+        """
+        Approximate Jaccard search through MinHash + banded LSH.
+
+        Only documents sharing at least one LSH bucket with the query are
+        considered. With ``rerank`` they are scored by exact Jaccard,
+        otherwise by the MinHash estimate. More bands raise recall; more
+        rows per band raise precision. Fewer than ``top_k`` results are
+        returned when fewer candidates collide.
+        """
+        if top_k <= 0:
+            return []
+        lsh = self._sync_lsh()
+        q_set = set(preprocess(query))
+        q_sig = lsh.signature(q_set)
+        scores = []
+        for doc_id in lsh.candidates(q_sig):
+            if doc_id in self.index.deleted:
+                continue
+            if rerank:
+                score = self._jaccard(q_set, self.doc_sets[doc_id])
+            else:
+                score = lsh.estimate(q_sig, doc_id)
+            scores.append((score, doc_id))
+        return [(score, self.corpus[d]) for score, d in _top_k(scores, top_k, True)]
+
+
+class MinHashLSH:
+    """
+    MinHash signatures with banded locality-sensitive hashing.
+
+    Every token is hashed to a stable 31-bit value, then through
+    ``num_bands * rows_per_band`` universal hash functions
+    h(x) = (a * x + b) mod (2^31 - 1); a set's signature is the minimum of
+    each function over its tokens. Signatures live in one flat
+    ``array('I')``. Each band of ``rows_per_band`` values is hashed into a
+    bucket table, and two sets become candidates when any band matches,
+    which happens with probability 1 - (1 - J^rows)^bands for Jaccard J.
+    """
+
+    PRIME = (1 << 31) - 1
+
+    def __init__(self, sets: List[frozenset], num_bands: int = 16, rows_per_band: int = 4,
+                 seed: int = 1):
+        self.num_bands = num_bands
+        self.rows_per_band = rows_per_band
+        self.num_perm = num_bands * rows_per_band
+        rng = random.Random(seed)
+        self.a = [rng.randrange(1, self.PRIME) for _ in range(self.num_perm)]
+        self.b = [rng.randrange(0, self.PRIME) for _ in range(self.num_perm)]
+        self._hash_cache: Dict[str, int] = {}
+        self.signatures = array("I")
+        self.buckets: List[Dict[int, List[int]]] = [defaultdict(list) for _ in range(num_bands)]
+        for doc_id, token_set in enumerate(sets):
+            self.add(doc_id, token_set)
+
+    def add(self, doc_id: int, token_set) -> None:
+        """Append the signature of ``doc_id`` (ids must be added in order)."""
+        sig = self.signature(token_set)
+        self.signatures.extend(sig)
+        if token_set:
+            for band, key in enumerate(self._band_keys(sig)):
+                self.buckets[band][key].append(doc_id)
+
+    def _token_hash(self, token: str) -> int:
+        value = self._hash_cache.get(token)
+        if value is None:
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            value = self._hash_cache[token] = int.from_bytes(digest, "little") % self.PRIME
+        return value
+
+    def signature(self, token_set) -> List[int]:
+        """MinHash signature of a token set (all PRIME for the empty set)."""
+        hashes = [self._token_hash(t) for t in token_set]
+        if not hashes:
+            return [self.PRIME] * self.num_perm
+        p = self.PRIME
+        return [min((a * x + b) % p for x in hashes) for a, b in zip(self.a, self.b)]
+
+    def _band_keys(self, sig: List[int]) -> List[int]:
+        r = self.rows_per_band
+        return [hash(tuple(sig[i * r:(i + 1) * r])) for i in range(self.num_bands)]
+
+    def candidates(self, sig: List[int]) -> List[int]:
+        """Doc ids sharing at least one band bucket with ``sig``, ascending."""
+        found = set()
+        for band, key in enumerate(self._band_keys(sig)):
+            found.update(self.buckets[band].get(key, ()))
+        return sorted(found)
+
+    def estimate(self, sig: List[int], doc_id: int) -> float:
+        """Estimated Jaccard similarity: share of equal signature slots."""
+        start = doc_id * self.num_perm
+        doc_sig = self.signatures[start:start + self.num_perm]
+        return sum(x == y for x, y in zip(sig, doc_sig)) / self.num_perm
 
 
 # ===========================================================================
@@ -189,49 +1760,424 @@ class BM25Search:
     Parameters:
         k1  - term frequency saturation (default 1.5)
         b   - length normalization (default 0.75)
+        cache - optional QueryCache of results for repeated queries
+
+    Scores come from the postings of the shared :class:`CorpusIndex`. N,
+    avgdl and df are read from the index on every query, so the index can
+    change between queries without any rebuild here; idf values and the
+    pruning bounds are cached until the index's generation changes.
+
+    save() writes the index together with the idf and pruning-bound tables,
+    so a search opened with load() answers its first query from the file.
     """
 
-    def __init__(self, corpus: List[str], k1: float = 1.5, b: float = 0.75):
-        self.corpus = corpus
+    BLOCK_SIZE = 64  # postings per block for Block-Max WAND upper bounds
+    higher_is_better = True
+
+    def __init__(self, corpus: Union[List[str], CorpusIndex], k1: float = 1.5, b: float = 0.75,
+                 cache: Optional[QueryCache] = None):
+        self.index = _as_index(corpus)
         self.k1 = k1
         self.b = b
-        self.tokenized_corpus = [preprocess(doc) for doc in corpus]
-        self.N = len(corpus)
-        self.avgdl = sum(len(d) for d in self.tokenized_corpus) / self.N if self.N else 1
-        self.df: Dict[str, int] = self._compute_df()
-
-    def _compute_df(self) -> Dict[str, int]:
-        df: Dict[str, int] = defaultdict(int)
-        for tokens in self.tokenized_corpus:
-            for term in set(tokens):
-                df[term] += 1
-        return df
+        self.cache = cache
+        self._idf_cache: Dict[str, float] = {}
+        self._block_max_cache: Dict[str, List[float]] = {}
+        self._cache_generation: Optional[int] = None
+        self._stored: Optional[_SegmentFile] = None  # idf / block_max tables from load()
+
+    @property
+    def corpus(self) -> List[str]:
+        return self.index.corpus
+
+    @property
+    def N(self) -> int:
+        return self.index.num_docs
+
+    @property
+    def avgdl(self) -> float:
+        return self.index.total_length / self.N if self.N else 1
+
+    @property
+    def df(self) -> Dict[str, int]:
+        return self.index.df
 
     def _idf(self, term: str) -> float:
         n = self.df.get(term, 0)
         return math.log((self.N - n + 0.5) / (n + 0.5) + 1)
 
-    def _score(self, query_tokens: List[str], doc_tokens: List[str]) -> float:
-        tf = Counter(doc_tokens)
-        dl = len(doc_tokens)
-        score = 0.0
+    def _check_caches(self) -> None:
+        if self._cache_generation != self.index.generation:
+            self._idf_cache.clear()
+            self._block_max_cache.clear()
+            self._stored = None
+            self._cache_generation = self.index.generation
+
+    def idf(self, term: str) -> float:
+        """idf of ``term``, cached until the index changes."""
+        self._check_caches()
+        value = self._idf_cache.get(term)
+        if value is None:
+            term_id = self.index.term_ids.get(term) if self._stored is not None else None
+            if term_id is not None:
+                value = self._idf_cache[term] = self._stored.idf[term_id]
+            else:
+                value = self._idf_cache[term] = self._idf(term)
+        return value
+
+    def _block_max(self, term: str) -> List[float]:
+        """
+        Maximum score contribution of ``term`` in every block of BLOCK_SIZE
+        postings, computed on first use and cached until the index changes.
+        """
+        self._check_caches()
+        block_max = self._block_max_cache.get(term)
+        if block_max is None and self._stored is not None:
+            term_id = self.index.term_ids[term]
+            stored = self._stored
+            block_max = self._block_max_cache[term] = \
+                stored.block_max[stored.block_ptr[term_id]:stored.block_ptr[term_id + 1]]
+        if block_max is None:
+            idf, avgdl, lengths = self.idf(term), self.avgdl, self.index.doc_lengths
+            postings = self.index.postings[self.index.term_ids[term]]
+            contribs = [self._term_score(idf, tf_val, lengths[doc_id], avgdl)
+                        for doc_id, tf_val in zip(postings.doc_ids, postings.tfs)]
+            block_max = self._block_max_cache[term] = [
+                max(contribs[i:i + self.BLOCK_SIZE])
+                for i in range(0, len(contribs), self.BLOCK_SIZE)
+            ]
+        return block_max
+
+    def __getstate__(self):
+        # Cached tables may be views of a mapped segment; they refill on demand.
+        return dict(self.__dict__, _idf_cache={}, _block_max_cache={})
+
+    def save(self, path: str) -> None:
+        """Write the index plus this search's idf and pruning-bound tables."""
+        index = self.index
+        arrays = index._segment_arrays()
+        arrays["idf"] = array("d", (self.idf(term) for term in index.vocab))
+        block_ptr, block_max = array("q", [0]), array("d")
+        for term in index.vocab:
+            block_max.extend(self._block_max(term))
+            block_ptr.append(len(block_max))
+        arrays["block_ptr"], arrays["block_max"] = block_ptr, block_max
+        meta = {"total_length": index.total_length,
+                "bm25": {"k1": self.k1, "b": self.b, "block_size": self.BLOCK_SIZE}}
+        _write_segment(path, arrays, meta)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "BM25Search":
+        """
+        Open a segment written by :meth:`save` (or :meth:`CorpusIndex.save`,
+        in which case idf and bounds are computed on demand as usual).
+        """
+        segment = _SegmentFile(path, mmap)
+        params = segment.meta.get("bm25", {})
+        search = cls(CorpusIndex._from_segment(segment),
+                     **{k: v for k, v in params.items() if k in ("k1", "b")})
+        if "idf" in segment and params.get("block_size") == cls.BLOCK_SIZE:
+            search._stored = segment
+            search._cache_generation = search.index.generation
+        return search
+
+    def _term_score(self, idf: float, tf_val: int, dl: int, avgdl: float) -> float:
+        numerator = tf_val * (self.k1 + 1)
+        denominator = tf_val + self.k1 * (1 - self.b + self.b * dl / avgdl)
+        return idf * (numerator / denominator)
+
+    def _scores(self, query_tokens: List[str], docs: range) -> Dict[int, float]:
+        """Accumulate BM25 scores over the postings of the query terms only."""
+        scores: Dict[int, float] = {}
+        index = self.index
+        deleted, lengths, avgdl = index.deleted, index.doc_lengths, self.avgdl
+        k1, b = self.k1, self.b
         for term in query_tokens:
-            if term not in tf:
+            term_id = index.term_ids.get(term)
+            if term_id is None or not self.df[term]:
                 continue
-            idf = self._idf(term)
-            tf_val = tf[term]
-            numerator = tf_val * (self.k1 + 1)
-            denominator = tf_val + self.k1 * (1 - self.b + self.b * dl / self.avgdl)
-            score += idf * (numerator / denominator)
-        return score
-
-    def search(self, query: str, top_k: int = 3) -> List[Tuple[float, str]]:
-        q_tokens = preprocess(query)
-        scores = [
-            (self._score(q_tokens, doc_tokens), doc)
-            for doc_tokens, doc in zip(self.tokenized_corpus, self.corpus)
+            idf = self.idf(term)
+            postings = index.postings[term_id]
+            lo, hi = _postings_span(postings, docs)
+            # Same arithmetic as _term_score, inlined for the hot loop.
+            for doc_id, tf_val in zip(postings.doc_ids[lo:hi], postings.tfs[lo:hi]):
+                if deleted and doc_id in deleted:
+                    continue
+                numerator = tf_val * (k1 + 1)
+                denominator = tf_val + k1 * (1 - b + b * lengths[doc_id] / avgdl)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * (numerator / denominator)
+        return scores
+
+    def _rank(self, scores: Dict[int, float], top_k: int, docs: range) -> List[Tuple[float, int]]:
+        """
+        Best ``top_k`` of ``scores``, padded with unmatched documents, which
+        all score 0.0, in doc id order.
+        """
+        ranked = _top_k(((score, d) for d, score in scores.items()), top_k, True)
+        if len(ranked) < top_k:
+            deleted = self.index.deleted
+            for doc_id in docs:
+                if len(ranked) >= top_k:
+                    break
+                if doc_id not in scores and doc_id not in deleted:
+                    ranked.append((0.0, doc_id))
+        return ranked
+
+    def _search_pruned(self, query_tokens: List[str], top_k: int,
+                       docs: range) -> List[Tuple[float, int]]:
+        """
+        Block-Max WAND top-k retrieval.
+
+        Cursors walk the query terms' postings in doc_id order. A document
+        is only scored when the sum of its terms' upper bounds (first whole
+        list, then the current block) can reach the k-th best score so far;
+        otherwise cursors jump ahead. Scores are summed in query order
+        exactly as :meth:`_scores` does.
+        """
+        if top_k <= 0:
+            return []
+        index = self.index
+        deleted, lengths, avgdl = index.deleted, index.doc_lengths, self.avgdl
+        counts = Counter(t for t in query_tokens if t in index.term_ids and self.df[t])
+        cursors = [
+            _PostingCursor(index.postings[index.term_ids[t]], self._block_max(t), self.idf(t),
+                           self.BLOCK_SIZE, m)
+            for t, m in counts.items()
         ]
-        return sorted(scores, reverse=True)[:top_k]
+        for cursor in cursors:
+            cursor.advance_to(docs.start)
+        by_term = dict(zip(counts, cursors))
+        order = [by_term[t] for t in query_tokens if t in by_term]
+        cursors = [c for c in cursors if c.doc < docs.stop]
+
+        heap: List[Tuple[float, int]] = []  # (score, -doc_id), worst on top
+        threshold = -math.inf
+
+        def can_reach(bound: float) -> bool:
+            # Documents arrive in doc id order and ties go to the lower id, so
+            # only a strictly higher score can enter; the slack absorbs
+            # rounding in the bound sums.
+            return bound * (1 + 1e-9) > threshold
+
+        while cursors:
+            cursors.sort(key=attrgetter("doc"))
+            bound, pivot = 0.0, None
+            for i, cursor in enumerate(cursors):
+                bound += cursor.upper_bound
+                if can_reach(bound):
+                    pivot = i
+                    break
+            if pivot is None:
+                break
+            pivot_doc = cursors[pivot].doc
+            while pivot + 1 < len(cursors) and cursors[pivot + 1].doc == pivot_doc:
+                pivot += 1
+
+            if cursors[0].doc != pivot_doc:
+                for cursor in cursors[:pivot]:
+                    cursor.advance_to(pivot_doc)
+            else:
+                block_bound = sum(c.block_bound(pivot_doc) for c in cursors[:pivot + 1])
+                if pivot_doc in deleted:
+                    next_doc = pivot_doc + 1
+                elif can_reach(block_bound):
+                    score = 0.0
+                    for cursor in order:
+                        if cursor.doc == pivot_doc:
+                            score += self._term_score(cursor.idf, cursor.tf(),
+                                                      lengths[pivot_doc], avgdl)
+                    entry = (score, -pivot_doc)
+                    if len(heap) < top_k:
+                        heapq.heappush(heap, entry)
+                    elif entry > heap[0]:
+                        heapq.heapreplace(heap, entry)
+                    if len(heap) == top_k:
+                        threshold = heap[0][0]
+                    next_doc = pivot_doc + 1
+                else:
+                    # No document before the end of the shallowest block can
+                    # reach the threshold either.
+                    next_doc = min(c.block_end() for c in cursors[:pivot + 1])
+                    if pivot + 1 < len(cursors):
+                        next_doc = min(next_doc, cursors[pivot + 1].doc)
+                for cursor in cursors[:pivot + 1]:
+                    cursor.advance_to(next_doc)
+            cursors = [c for c in cursors if c.doc < docs.stop]
+
+        return self._rank({-neg_id: score for score, neg_id in heap}, top_k, docs)
+
+    def search(self, query: str, top_k: int = 3, prune: bool = True,
+               doc_range: Optional[Tuple[int, int]] = None) -> List[Tuple[float, str]]:
+        """
+        Return the ``top_k`` (score, doc) pairs. With ``prune`` (the default)
+        documents that cannot enter the top-k are skipped via Block-Max WAND;
+        ``prune=False`` scores every matching document. Both give the same
+        results. ``doc_range = (start, stop)`` restricts the search to those
+        doc ids (see :class:`ShardedSearch`).
+        """
+        return [(score, doc) for score, _, doc in
+                self.search_with_ids(query, top_k, prune, doc_range)]
+
+    def search_with_ids(self, query: str, top_k: int = 3, prune: bool = True,
+                        doc_range: Optional[Tuple[int, int]] = None) -> List[Tuple[float, int, str]]:
+        """Like :meth:`search` but returns (score, doc_id, doc); ties go to the lower doc id."""
+        if top_k <= 0:
+            return []
+        q_tokens = preprocess(query)
+        return _cached_search(self, (self.k1, self.b), q_tokens, top_k, doc_range,
+                              lambda: self._search_tokens(q_tokens, top_k, prune, doc_range))
+
+    def _search_tokens(self, q_tokens: List[str], top_k: int, prune: bool,
+                       doc_range: Optional[Tuple[int, int]]) -> List[Tuple[float, int, str]]:
+        docs = _doc_range(self.index, doc_range)
+        if prune:
+            ranked = self._search_pruned(q_tokens, top_k, docs)
+        else:
+            ranked = self._rank(self._scores(q_tokens, docs), top_k, docs)
+        return [(score, d, self.corpus[d]) for score, d in ranked]
+
+
+class _PostingCursor:
+    """Iterator over one term's postings with whole-list and per-block maxima."""
+
+    __slots__ = ("postings", "block_max", "idf", "block_size", "multiplicity",
+                 "upper_bound", "pos", "doc")
+
+    def __init__(self, postings: _Postings, block_max: List[float], idf: float,
+                 block_size: int, multiplicity: int):
+        self.postings = postings
+        self.block_max = block_max
+        self.idf = idf
+        self.block_size = block_size
+        self.multiplicity = multiplicity
+        self.upper_bound = max(block_max) * multiplicity
+        self.pos = 0
+        self.doc = postings.doc_ids[0]  # current doc_id, math.inf once exhausted
+
+    def tf(self) -> int:
+        return self.postings.tfs[self.pos]
+
+    def advance_to(self, doc_id: int) -> None:
+        """Move to the first posting with doc_id >= ``doc_id``."""
+        doc_ids = self.postings.doc_ids
+        self.pos = pos = bisect_left(doc_ids, doc_id, self.pos)
+        self.doc = doc_ids[pos] if pos < len(doc_ids) else math.inf
+
+    def block_bound(self, doc_id: int) -> float:
+        """Upper bound for ``doc_id`` from the block the cursor is in."""
+        if self.doc != doc_id:
+            return 0.0
+        return self.block_max[self.pos // self.block_size] * self.multiplicity
+
+    def block_end(self) -> int:
+        """First doc_id after the current block."""
+        doc_ids = self.postings.doc_ids
+        last = min((self.pos // self.block_size + 1) * self.block_size, len(doc_ids)) - 1
+        return doc_ids[last] + 1
+
+
+# ===========================================================================
+# SHARDED SEARCH
+# ===========================================================================
+
+class ShardedSearch:
+    """
+    Runs a search over ``num_shards`` doc-id ranges of its index in parallel
+    and merges the per-shard top-k lists into the global top-k.
+
+    Shards partition documents, not statistics: every shard is scored with
+    ``search_with_ids(..., doc_range=shard)`` against the whole index's N,
+    avgdl, df and vocabulary, so the merged results equal the unsharded
+    search.
+    :meth:`search` fans out to a process pool whose workers each hold a
+    copy of the search (an index opened with :meth:`CorpusIndex.load`
+    re-maps its file instead); :meth:`search_batch` fans out to threads,
+    since the NumPy kernels release the GIL. The pool is restarted when the
+    index changes. A shard served by another machine merges the same way.
+    """
+
+    def __init__(self, search, num_shards: Optional[int] = None,
+                 num_workers: Optional[int] = None):
+        self.searcher = search
+        self.num_shards = num_shards or os.cpu_count() or 1
+        self.num_workers = num_workers or self.num_shards
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._pool_state: Optional[Tuple[int, int]] = None
+
+    def shards(self) -> List[Tuple[int, int]]:
+        """The current ``(start, stop)`` doc-id range of every shard."""
+        n = len(self.searcher.index)
+        return [(i * n // self.num_shards, (i + 1) * n // self.num_shards)
+                for i in range(self.num_shards)]
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        index = self.searcher.index
+        state = (index.generation, index.epoch)
+        if self._processes is None or self._pool_state != state:
+            if self._processes is not None:
+                self._processes.shutdown()
+            self._processes = ProcessPoolExecutor(self.num_workers, initializer=_init_search_worker,
+                                                  initargs=(self.searcher,))
+            self._pool_state = state
+        return self._processes
+
+    def _merge(self, shard_results: List[list], top_k: int, key) -> list:
+        return list(islice(heapq.merge(*shard_results, key=key), top_k))
+
+    def search(self, query: str, top_k: int = 3, **kwargs) -> List[Tuple[float, str]]:
+        """Sharded ``search``; extra keyword arguments (e.g. ``prune``) are passed on."""
+        return [(score, doc) for score, _, doc in self.search_with_ids(query, top_k, **kwargs)]
+
+    def search_with_ids(self, query: str, top_k: int = 3, **kwargs) -> List[Tuple[float, int, str]]:
+        """Sharded ``search_with_ids``."""
+        if top_k <= 0:
+            return []
+        pool = self._process_pool()
+        futures = [pool.submit(_search_shard, query, top_k, shard, kwargs) for shard in self.shards()]
+        sign = -1.0 if self.searcher.higher_is_better else 1.0
+        return self._merge([f.result() for f in futures], top_k, key=lambda e: (sign * e[0], e[1]))
+
+    def search_batch(self, queries: List[str], top_k: int = 3,
+                     batch_size: int = 256) -> List[List[Tuple[float, str]]]:
+        """Sharded ``search_batch`` of a vector search, one thread per shard."""
+        searcher = self.searcher
+        searcher._dense()  # build once here rather than racing in the threads
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(self.num_workers)
+        per_shard = list(self._threads.map(
+            lambda shard: searcher._search_batch_ids(queries, top_k, batch_size, shard),
+            self.shards()))
+        sign = -1.0 if searcher.higher_is_better else 1.0
+        return [[(score, searcher.corpus[d]) for score, d in
+                 self._merge([results[i] for results in per_shard], top_k,
+                             key=lambda e: (sign * e[0], e[1]))]
+                for i in range(len(queries))]
+
+    def close(self) -> None:
+        """Shut down the worker pools."""
+        for pool in (self._processes, self._threads):
+            if pool is not None:
+                pool.shutdown()
+        self._processes = self._threads = None
+
+    def __enter__(self) -> "ShardedSearch":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+_WORKER_SEARCH = None
+
+
+def _init_search_worker(search) -> None:
+    global _WORKER_SEARCH
+    _WORKER_SEARCH = search
+
+
+def _search_shard(query: str, top_k: int, doc_range: Tuple[int, int],
+                  kwargs: dict) -> List[Tuple[float, int, str]]:
+    return _WORKER_SEARCH.search_with_ids(query, top_k, doc_range=doc_range, **kwargs)
 
 
 # ===========================================================================
@@ -268,19 +2214,21 @@ if __name__ == "__main__":
     print(f"  Query: '{query}'")
     print("=" * 55)
 
-    cosine = CosineSimilaritySearch(corpus)
+    index = CorpusIndex(corpus)  # tokenize once, share across all five
+
+    cosine = CosineSimilaritySearch(index)
     print_results("1. Cosine Similarity (higher = better)", cosine.search(query))
 
-    euclidean = EuclideanDistanceSearch(corpus)
+    euclidean = EuclideanDistanceSearch(index)
     print_results("2. Euclidean Distance (lower = better)", euclidean.search(query), ascending=True)
 
-    manhattan = ManhattanDistanceSearch(corpus)
+    manhattan = ManhattanDistanceSearch(index)
     print_results("3. Manhattan Distance (lower = better)", manhattan.search(query), ascending=True)
 
-    jaccard = JaccardSimilaritySearch(corpus)
+    jaccard = JaccardSimilaritySearch(index)
     print_results("4. Jaccard Similarity (higher = better)", jaccard.search(query))
 
-    bm25 = BM25Search(corpus)
+    bm25 = BM25Search(index)
     print_results("5. BM25 Search (higher = better)", bm25.search(query))
 
     print("\n" + "=" * 55)
@@ -15,18 +15,61 @@ Algorithm Steps:
 
 from __future__ import annotations
 
+import heapq
+import os
 import re
-from collections import defaultdict
-from typing import Dict, List, Optional, Tuple
+import tempfile
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter, OrderedDict, defaultdict, deque
+from collections.abc import Mapping
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import groupby, islice
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from _common import PickleByConfig, SectionFile, write_sections
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for padded batch output
+    np = None
 
 
 # ---------------------------------------------------------------------------
 # Helper utilities
 # ---------------------------------------------------------------------------
 
+_WORD_RE = re.compile(r"\w+|[^\w\s]")
+
+
 def _pre_tokenize(text: str) -> List[str]:
     """Split text on whitespace and punctuation, lowercasing."""
-    return re.findall(r"\w+|[^\w\s]", text.lower())
+    return _WORD_RE.findall(text.lower())
+
+
+_TRIE_END = ""  # never a single character, so safe as the terminal key
+
+
+def _build_tries(vocab: Dict[str, int]) -> Tuple[dict, dict]:
+    """
+    Compile the vocabulary into two character tries for longest-match lookup.
+
+    The first trie holds every token verbatim (word-initial pieces); the
+    second holds ``##`` continuations with the marker stripped. Terminal
+    nodes store the vocabulary token under ``_TRIE_END``.
+    """
+    root: dict = {}
+    cont_root: dict = {}
+    for token in vocab:
+        tries = [(root, token)]
+        if token.startswith("##") and len(token) > 2:
+            tries.append((cont_root, token[2:]))
+        for node, chars in tries:
+            for c in chars:
+                node = node.setdefault(c, {})
+            node[_TRIE_END] = token
+    return root, cont_root
 
 
 def _word_to_chars(word: str) -> List[str]:
@@ -36,6 +79,138 @@ def _word_to_chars(word: str) -> List[str]:
     return [word[0]] + [f"##{c}" for c in word[1:]]
 
 
+def _count_words(sentences: List[str]) -> Tuple[Dict[str, int], Dict[str, int], int]:
+    """
+    Count words in one shard of sentences.
+
+    Returns ``(freq, first_seen, n_tokens)`` where ``first_seen`` holds the
+    shard-local token position at which each word first appeared.
+    """
+    freq: Dict[str, int] = {}
+    first_seen: Dict[str, int] = {}
+    position = 0
+    for sentence in sentences:
+        for word in _pre_tokenize(sentence):
+            if word in freq:
+                freq[word] += 1
+            else:
+                freq[word] = 1
+                first_seen[word] = position
+            position += 1
+    return freq, first_seen, position
+
+
+def _ordered_map(pool: Executor, fn, items: Iterable, max_pending: int) -> Iterator:
+    """Like ``pool.map`` but keeps at most ``max_pending`` tasks in flight."""
+    pending: deque = deque()
+    for item in items:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class _WordCounter:
+    """
+    Word-frequency accumulator with an optional cap on distinct words.
+
+    Each word remembers the global position at which it was first seen, so
+    the final counts come back in the same order a plain dict would give.
+    When the cap is exceeded, all but the ``max_words // RESIDENT_DIVISOR``
+    most frequent words are written to a sorted run file on disk; the hot
+    words stay in memory, where they keep being counted instead of
+    reappearing in every run. :meth:`counts` merges the runs, at most
+    ``MERGE_FAN_IN`` files at a time, so the number of open files stays
+    bounded however many runs there are.
+    """
+
+    RESIDENT_DIVISOR = 4
+    MERGE_FAN_IN = 64
+
+    def __init__(self, max_words: Optional[int] = None, spill_dir: Optional[str] = None):
+        self.max_words = max_words
+        self.spill_dir = spill_dir
+        self.freq: Dict[str, int] = {}
+        self.first_seen: Dict[str, int] = {}
+        self.position = 0
+        self.runs: List[str] = []
+
+    def merge(self, freq: Dict[str, int], first_seen: Dict[str, int], n_tokens: int) -> None:
+        """Fold in one shard's counts from :func:`_count_words`."""
+        own_freq, own_first = self.freq, self.first_seen
+        for word, count in freq.items():
+            if word in own_freq:
+                own_freq[word] += count
+            else:
+                own_freq[word] = count
+                own_first[word] = self.position + first_seen[word]
+        self.position += n_tokens
+        if self.max_words is not None and len(own_freq) > self.max_words:
+            self._spill(keep=self.max_words // self.RESIDENT_DIVISOR)
+
+    def _spill(self, keep: int = 0) -> None:
+        """Write all but the ``keep`` most frequent words to a new run."""
+        hot = set(heapq.nlargest(keep, self.freq, key=self.freq.get)) if keep else set()
+        cold = sorted(word for word in self.freq if word not in hot)
+        self.runs.append(self._write_run(
+            (word, self.freq[word], self.first_seen[word]) for word in cold))
+        self.freq = {word: self.freq[word] for word in self.freq if word in hot}
+        self.first_seen = {word: self.first_seen[word] for word in self.freq}
+
+    def _write_run(self, rows: Iterable[Tuple[str, int, int]]) -> str:
+        fd, path = tempfile.mkstemp(prefix="wordpiece-", suffix=".run", dir=self.spill_dir)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                for word, count, first in rows:
+                    f.write(f"{word}\t{count}\t{first}\n")
+        except BaseException:
+            os.remove(path)
+            raise
+        return path
+
+    @staticmethod
+    def _read_run(path: str) -> Iterator[Tuple[str, int, int]]:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                word, count, first = line.rstrip("\n").split("\t")
+                yield word, int(count), int(first)
+
+    def _merge_runs(self, paths: List[str]) -> Iterator[Tuple[str, int, int]]:
+        """Sorted ``(word, total, first_seen)`` rows summed across ``paths``."""
+        runs = [self._read_run(path) for path in paths]
+        for word, group in groupby(heapq.merge(*runs), key=lambda r: r[0]):
+            total, first = 0, None
+            for _, count, seen in group:
+                total += count
+                first = seen if first is None else min(first, seen)
+            yield word, total, first
+
+    def counts(self, min_frequency: int = 1) -> Dict[str, int]:
+        """Return merged ``{word: count}`` in first-seen order."""
+        if not self.runs:
+            return {w: c for w, c in self.freq.items() if c >= min_frequency}
+        self._spill()
+        merged: List[Tuple[int, str, int]] = []
+        try:
+            # Intermediate passes fold the oldest MERGE_FAN_IN runs into one.
+            while len(self.runs) > self.MERGE_FAN_IN:
+                group = self.runs[:self.MERGE_FAN_IN]
+                path = self._write_run(self._merge_runs(group))
+                self.runs = self.runs[self.MERGE_FAN_IN:] + [path]
+                for old in group:
+                    os.remove(old)
+            for word, total, first in self._merge_runs(self.runs):
+                if total >= min_frequency:
+                    merged.append((first, word, total))
+        finally:
+            for path in self.runs:
+                os.remove(path)
+            self.runs = []
+        merged.sort()
+        return {word: total for _, word, total in merged}
+
+
 # ---------------------------------------------------------------------------
 # Trainer
 # ---------------------------------------------------------------------------
@@ -47,14 +222,51 @@ class WordPieceTrainer:
             "[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"
         ]
 
-    def train(self, corpus: List[str]) -> "WordPieceTokenizer":
+    def train(self, corpus: List[str], num_workers: int = 1) -> "WordPieceTokenizer":
         """Train on a list of sentences and return a fitted tokenizer."""
+        return self.train_from_iterator(corpus, num_workers=num_workers)
+
+    def train_from_files(self, paths: Iterable[str], encoding: str = "utf-8",
+                         **kwargs) -> "WordPieceTokenizer":
+        """Train on one or more text files, streaming them line by line."""
+        def lines() -> Iterator[str]:
+            for path in paths:
+                with open(path, encoding=encoding) as f:
+                    yield from f
+        return self.train_from_iterator(lines(), **kwargs)
+
+    def train_from_iterator(self, iterator: Iterable[str], chunk_size: int = 10_000,
+                            max_words_in_memory: Optional[int] = None,
+                            min_frequency: int = 1,
+                            spill_dir: Optional[str] = None,
+                            num_workers: int = 1) -> "WordPieceTokenizer":
+        """
+        Train on any iterable of sentences without materialising it.
+
+        Sentences are consumed ``chunk_size`` at a time. When more than
+        ``max_words_in_memory`` distinct words are held, the counts are
+        spilled to a sorted run file in ``spill_dir`` and merged back at the
+        end; words seen fewer than ``min_frequency`` times are dropped then.
+        With the defaults the result is identical to :meth:`train`.
+
+        ``num_workers > 1`` counts chunks in a process pool; shard counts
+        are merged in input order, so the result matches the serial path.
+        """
         # Step 1 – count word frequencies
-        word_freq: Dict[str, int] = defaultdict(int)
-        for sentence in corpus:
-            for word in _pre_tokenize(sentence):
-                word_freq[word] += 1
-
+        counter = _WordCounter(max_words_in_memory, spill_dir)
+        iterator = iter(iterator)
+        chunks = iter(lambda: list(islice(iterator, chunk_size)), [])
+        if num_workers > 1:
+            with ProcessPoolExecutor(max_workers=num_workers) as pool:
+                for shard in _ordered_map(pool, _count_words, chunks, 2 * num_workers):
+                    counter.merge(*shard)
+        else:
+            for chunk in chunks:
+                counter.merge(*_count_words(chunk))
+        return self._train_on_counts(counter.counts(min_frequency))
+
+    def _train_on_counts(self, word_freq: Dict[str, int]) -> "WordPieceTokenizer":
+        """Build the vocabulary from word counts (in first-seen order)."""
         # Step 2 – initialise vocab with special tokens + all unique chars
         vocab: Dict[str, int] = {}
         for tok in self.special_tokens:
@@ -70,80 +282,378 @@ class WordPieceTrainer:
                     vocab[p] = len(vocab)
 
         # Step 3 – merge loop
+        stats = _PairStatistics(word_freq, word_splits)
         while len(vocab) < self.vocab_size:
-            pair_scores = self._compute_pair_scores(word_freq, word_splits)
-            if not pair_scores:
+            best_pair = stats.best_pair()
+            if best_pair is None:
                 break
-            best_pair = max(pair_scores, key=pair_scores.__getitem__)
             merged = self._merge_token(best_pair)
             if merged not in vocab:
                 vocab[merged] = len(vocab)
-            word_splits = self._apply_merge(word_splits, best_pair, merged)
+            stats.merge(best_pair, merged)
 
         return WordPieceTokenizer(vocab=vocab, special_tokens=self.special_tokens)
 
-    @staticmethod
-    def _compute_pair_scores(word_freq, word_splits):
-        pair_freq: Dict[Tuple[str, str], int] = defaultdict(int)
-        piece_freq: Dict[str, int] = defaultdict(int)
-
-        for word, freq in word_freq.items():
-            pieces = word_splits[word]
-            for piece in pieces:
-                piece_freq[piece] += freq
-            for i in range(len(pieces) - 1):
-                pair_freq[(pieces[i], pieces[i + 1])] += freq
-
-        scores: Dict[Tuple[str, str], float] = {}
-        for pair, freq in pair_freq.items():
-            denom = piece_freq[pair[0]] * piece_freq[pair[1]]
-            scores[pair] = freq / denom if denom else 0.0
-        return scores
-
     @staticmethod
     def _merge_token(pair: Tuple[str, str]) -> str:
         a, b = pair
         return a + b.lstrip("#") if b.startswith("##") else a + b
 
     @staticmethod
-    def _apply_merge(word_splits, pair, merged):
+    def _merge_pieces(pieces: List[str], pair: Tuple[str, str], merged: str) -> List[str]:
         a, b = pair
-        new_splits = {}
-        for word, pieces in word_splits.items():
-            new_pieces, i = [], 0
-            while i < len(pieces):
-                if i < len(pieces) - 1 and pieces[i] == a and pieces[i + 1] == b:
-                    new_pieces.append(merged)
-                    i += 2
-                else:
-                    new_pieces.append(pieces[i])
-                    i += 1
-            new_splits[word] = new_pieces
-        return new_splits
+        new_pieces, i = [], 0
+        while i < len(pieces):
+            if i < len(pieces) - 1 and pieces[i] == a and pieces[i + 1] == b:
+                new_pieces.append(merged)
+                i += 2
+            else:
+                new_pieces.append(pieces[i])
+                i += 1
+        return new_pieces
+
+
+class _PairStatistics:
+    """
+    Incremental pair/piece frequency bookkeeping for the merge loop.
+
+    Keeps pair frequencies, piece frequencies and a pair -> words reverse
+    index so that a merge only revisits the words containing the merged
+    pair. The best pair is taken from a lazily invalidated max-heap, which
+    is rebuilt from the live pairs once stale entries make it more than
+    ``HEAP_SLACK`` times their number.
+
+    Ties are broken exactly like a full rescan with ``max()`` would: the
+    pair occurring first (by word order, then position in the word) wins.
+    """
+
+    HEAP_SLACK = 4
+
+    def __init__(self, word_freq: Dict[str, int], word_splits: Dict[str, List[str]]):
+        self.words: List[str] = list(word_freq)
+        self.freqs: List[int] = [word_freq[w] for w in self.words]
+        self.splits: List[List[str]] = [word_splits[w] for w in self.words]
+
+        self.pair_freq: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.piece_freq: Dict[str, int] = defaultdict(int)
+        self.pair_words: Dict[Tuple[str, str], set] = defaultdict(set)
+        self.piece_pairs: Dict[str, set] = defaultdict(set)
+        self.first_word: Dict[Tuple[str, str], int] = {}
+        self.version: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.heap: List[Tuple[float, int, Tuple[str, str], int]] = []
+
+        for idx, pieces in enumerate(self.splits):
+            self._add_word(idx, pieces)
+        for pair in self.pair_freq:
+            self._push(pair)
+
+    # -- bookkeeping -------------------------------------------------------
+
+    def _add_word(self, idx: int, pieces: List[str]) -> None:
+        freq = self.freqs[idx]
+        for piece, count in Counter(pieces).items():
+            self.piece_freq[piece] += count * freq
+        for pair, count in Counter(zip(pieces, pieces[1:])).items():
+            self.pair_freq[pair] += count * freq
+            self.pair_words[pair].add(idx)
+            self.piece_pairs[pair[0]].add(pair)
+            self.piece_pairs[pair[1]].add(pair)
+            first = self.first_word.get(pair)
+            if first is None or idx < first:
+                self.first_word[pair] = idx
+
+    def _remove_word(self, idx: int, pieces: List[str]) -> None:
+        freq = self.freqs[idx]
+        for piece, count in Counter(pieces).items():
+            self.piece_freq[piece] -= count * freq
+        for pair, count in Counter(zip(pieces, pieces[1:])).items():
+            self.pair_freq[pair] -= count * freq
+            words = self.pair_words[pair]
+            words.discard(idx)
+            if words:
+                if self.first_word[pair] == idx:
+                    self.first_word[pair] = min(words)
+                continue
+            del self.pair_words[pair], self.pair_freq[pair], self.first_word[pair]
+            for piece in pair:
+                self.piece_pairs[piece].discard(pair)
+
+    def _score(self, pair: Tuple[str, str]) -> float:
+        denom = self.piece_freq[pair[0]] * self.piece_freq[pair[1]]
+        return self.pair_freq[pair] / denom if denom else 0.0
+
+    def _push(self, pair: Tuple[str, str]) -> None:
+        self.version[pair] += 1
+        heapq.heappush(
+            self.heap,
+            (-self._score(pair), self.first_word[pair], pair, self.version[pair]),
+        )
+
+    def _rebuild_heap(self) -> None:
+        # Every live pair's latest entry already carries its current score,
+        # so rebuilding from pair_freq keeps exactly the valid entries.
+        self.version = defaultdict(int, {pair: self.version[pair] for pair in self.pair_freq})
+        self.heap = [(-self._score(pair), self.first_word[pair], pair, self.version[pair])
+                     for pair in self.pair_freq]
+        heapq.heapify(self.heap)
+
+    def _pop_valid(self) -> Optional[Tuple[float, int, Tuple[str, str], int]]:
+        while self.heap:
+            entry = heapq.heappop(self.heap)
+            pair = entry[2]
+            if pair in self.pair_freq and self.version[pair] == entry[3]:
+                return entry
+        return None
+
+    # -- public API ----------------------------------------------------------
+
+    def best_pair(self) -> Optional[Tuple[str, str]]:
+        """Return the highest-scoring pair, or ``None`` if no pairs remain."""
+        top = self._pop_valid()
+        if top is None:
+            return None
+        # Several pairs may tie on score within the same first word; the one
+        # appearing earliest in that word is the one a rescan would pick.
+        group = [top]
+        while self.heap and self.heap[0][:2] == top[:2]:
+            entry = self._pop_valid()
+            if entry is None:
+                break
+            if entry[:2] != top[:2]:
+                heapq.heappush(self.heap, entry)
+                break
+            group.append(entry)
+        for entry in group:
+            heapq.heappush(self.heap, entry)
+        if len(group) == 1:
+            return top[2]
+        pieces = self.splits[top[1]]
+        candidates = {entry[2] for entry in group}
+        for pair in zip(pieces, pieces[1:]):
+            if pair in candidates:
+                return pair
+        return top[2]
+
+    def merge(self, pair: Tuple[str, str], merged: str) -> None:
+        """Apply ``pair -> merged`` to every word containing ``pair``."""
+        stale = set()
+        for idx in sorted(self.pair_words.get(pair, ())):
+            old = self.splits[idx]
+            new = WordPieceTrainer._merge_pieces(old, pair, merged)
+            self._remove_word(idx, old)
+            self._add_word(idx, new)
+            self.splits[idx] = new
+            stale.update(zip(old, old[1:]))
+            stale.update(zip(new, new[1:]))
+        # Any pair sharing a piece whose frequency moved needs a fresh score.
+        for piece in (pair[0], pair[1], merged):
+            stale.update(self.piece_pairs.get(piece, ()))
+        for p in stale:
+            if p in self.pair_freq:
+                self._push(p)
+        if len(self.heap) > self.HEAP_SLACK * len(self.pair_freq):
+            self._rebuild_heap()
 
 
 # ---------------------------------------------------------------------------
 # Tokenizer (inference)
 # ---------------------------------------------------------------------------
 
+class _LRUCache(PickleByConfig):
+    """
+    Thread-safe, size-bounded LRU mapping with hit/miss counters. A pickled
+    copy starts empty with the same size.
+    """
+
+    _PICKLED = ("maxsize",)
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if self.maxsize <= 0:
+            return None
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self._data.move_to_end(key)
+                self.hits += 1
+            return value
+
+    def put(self, key, value) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "size": len(self._data), "maxsize": self.maxsize}
+
+
 class WordPieceTokenizer:
     def __init__(self, vocab: Dict[str, int], special_tokens: Optional[List[str]] = None,
-                 unk_token: str = "[UNK]", max_chars_per_word: int = 100):
+                 unk_token: str = "[UNK]", max_chars_per_word: int = 100,
+                 cache_size: int = 10_000):
         self.vocab = vocab
         self.id_to_token: Dict[int, str] = {v: k for k, v in vocab.items()}
         self.special_tokens = special_tokens or []
         self.unk_token = unk_token
         self.max_chars_per_word = max_chars_per_word
+        self._root, self._cont_root = _build_tries(vocab)
+        self._cache = _LRUCache(cache_size)
 
     def tokenize(self, text: str) -> List[str]:
         tokens = []
         for word in _pre_tokenize(text):
-            tokens.extend(self._tokenize_word(word))
+            tokens.extend(self._lookup_word(word)[0])
         return tokens
 
     def encode(self, text: str) -> List[int]:
+        ids = []
+        for word in _pre_tokenize(text):
+            ids.extend(self._lookup_word(word)[1])
+        return ids
+
+    def tokenize_with_offsets(self, text: str) -> Tuple[List[str], array, array]:
+        """
+        Tokenize and report where each piece came from in ``text``.
+
+        Returns ``(tokens, starts, ends)``: ``tokens`` are the vocabulary's
+        own strings (no per-piece copies) and ``starts``/``ends`` are
+        parallel ``array('I')`` character offsets into the original text.
+        ``##`` continuations span just their characters; an unknown word is
+        a single ``unk_token`` spanning the whole word.
+        """
+        lowered = text.lower()
+        # Lowercasing is almost always length-preserving; when it is not
+        # (e.g. "İ"), map each lowered index back to its source character.
+        if len(lowered) == len(text):
+            source = None
+        else:
+            source = array("I")
+            for i, ch in enumerate(text):
+                source.extend([i] * len(ch.lower()))
+            source.append(len(text))
+
+        tokens: List[str] = []
+        starts, ends = array("I"), array("I")
+        cont_root = self._cont_root
+        for m in _WORD_RE.finditer(lowered):
+            word_start, n = m.span()
+            mark = len(tokens)
+            start, root = word_start, self._root
+            if n - word_start > self.max_chars_per_word:
+                start = -1
+            while 0 <= start < n:
+                node, match, end = root, None, start
+                for i in range(start, n):
+                    node = node.get(lowered[i])
+                    if node is None:
+                        break
+                    if _TRIE_END in node:
+                        match, end = node[_TRIE_END], i + 1
+                if match is None:
+                    start = -1
+                    break
+                tokens.append(match)
+                starts.append(start)
+                ends.append(end)
+                start, root = end, cont_root
+            if start < 0:
+                del tokens[mark:], starts[mark:], ends[mark:]
+                tokens.append(self.unk_token)
+                starts.append(word_start)
+                ends.append(n)
+
+        if source is not None:
+            for k in range(len(tokens)):
+                starts[k] = source[starts[k]]
+                ends[k] = source[ends[k] - 1] + 1
+        return tokens, starts, ends
+
+    def encode_with_offsets(self, text: str) -> Tuple[array, array, array]:
+        """Like :meth:`tokenize_with_offsets` but returns ``array('i')`` ids."""
+        tokens, starts, ends = self.tokenize_with_offsets(text)
         unk_id = self.vocab.get(self.unk_token, 0)
-        return [self.vocab.get(tok, unk_id) for tok in self.tokenize(text)]
+        vocab = self.vocab
+        return array("i", [vocab.get(tok, unk_id) for tok in tokens]), starts, ends
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Return word-cache ``hits``, ``misses``, current ``size`` and ``maxsize``."""
+        return self._cache.stats()
+
+    def clear_cache(self) -> None:
+        self._cache.clear()
+
+    def _lookup_word(self, word: str) -> Tuple[Tuple[str, ...], Tuple[int, ...]]:
+        """Return ``(pieces, ids)`` for a pre-tokenized word, via the LRU cache."""
+        entry = self._cache.get(word)
+        if entry is None:
+            pieces = tuple(self._tokenize_word(word))
+            unk_id = self.vocab.get(self.unk_token, 0)
+            entry = (pieces, tuple(self.vocab.get(tok, unk_id) for tok in pieces))
+            self._cache.put(word, entry)
+        return entry
+
+    def encode_batch(self, texts: Sequence[str], num_workers: int = 1, chunk_size: int = 1000,
+                     max_length: Optional[int] = None, truncation: bool = False,
+                     padding: bool = False, pad_token: str = "[PAD]"):
+        """
+        Encode many texts, returning ids in input order.
+
+        With ``num_workers > 1`` the texts are split into ``chunk_size``
+        slices and encoded in a process pool. ``truncation`` cuts every
+        sequence to ``max_length``. With ``padding`` the result is a pair of
+        NumPy int32 matrices ``(input_ids, attention_mask)`` padded to
+        ``max_length`` (or the longest sequence); otherwise a list of lists.
+        """
+        if truncation and max_length is None:
+            raise ValueError("truncation requires max_length")
+        chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        if num_workers > 1 and len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_encode_worker,
+                                     initargs=(self,)) as pool:
+                results = _ordered_map(pool, _encode_chunk, chunks, 2 * num_workers)
+                batch = [ids for chunk in results for ids in chunk]
+        else:
+            batch = [self.encode(text) for text in texts]
+
+        if truncation:
+            batch = [ids[:max_length] for ids in batch]
+        if not padding:
+            return batch
+
+        if np is None:
+            raise ImportError("encode_batch(padding=True) requires numpy")
+        width = max_length if max_length is not None else max(map(len, batch), default=0)
+        pad_id = self.vocab.get(pad_token, 0)
+        input_ids = np.full((len(batch), width), pad_id, dtype=np.int32)
+        attention_mask = np.zeros((len(batch), width), dtype=np.int32)
+        for row, ids in enumerate(batch):
+            if len(ids) > width:
+                raise ValueError(
+                    f"sequence {row} has {len(ids)} ids, longer than max_length={width}; "
+                    "pass truncation=True"
+                )
+            input_ids[row, :len(ids)] = ids
+            attention_mask[row, :len(ids)] = 1
+        return input_ids, attention_mask
 
     def decode(self, ids: List[int]) -> str:
         tokens = [self.id_to_token.get(i, self.unk_token) for i in ids]
@@ -152,22 +662,48 @@ class WordPieceTokenizer:
     def vocab_size(self) -> int:
         return len(self.vocab)
 
+    def save(self, path: str) -> None:
+        """Write the vocabulary and compiled tries in the binary format."""
+        _write_vocab_file(path, self)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True, cache_size: int = 10_000) -> "WordPieceTokenizer":
+        """
+        Open a file written by :meth:`save`.
+
+        With ``mmap=True`` the tables are memory-mapped rather than read, so
+        processes loading the same file share pages and nothing is rebuilt:
+        ``vocab``, ``id_to_token`` and the tries are read-only array views.
+        """
+        data = _VocabFile(path, mmap)
+        meta = data.meta
+        tokenizer = cls({}, special_tokens=meta["special_tokens"], unk_token=meta["unk_token"],
+                        max_chars_per_word=meta["max_chars_per_word"], cache_size=cache_size)
+        tokenizer.vocab = _MappedVocab(data)
+        tokenizer.id_to_token = _MappedIdToToken(data)
+        tokenizer._root = _MappedTrieNode(data, 0)
+        tokenizer._cont_root = _MappedTrieNode(data, meta["cont_root"])
+        return tokenizer
+
     def _tokenize_word(self, word: str) -> List[str]:
         if len(word) > self.max_chars_per_word:
             return [self.unk_token]
-        tokens, start = [], 0
-        while start < len(word):
-            end, found = len(word), False
-            while start < end:
-                candidate = word[start:end] if start == 0 else f"##{word[start:end]}"
-                if candidate in self.vocab:
-                    tokens.append(candidate)
-                    start = end
-                    found = True
+        tokens, start, n = [], 0, len(word)
+        root = self._root
+        while start < n:
+            # Walk the trie forward, remembering the last terminal seen: that
+            # is the longest vocabulary piece starting at ``start``.
+            node, match, end = root, None, start
+            for i in range(start, n):
+                node = node.get(word[i])
+                if node is None:
                     break
-                end -= 1
-            if not found:
+                if _TRIE_END in node:
+                    match, end = node[_TRIE_END], i + 1
+            if match is None:
                 return [self.unk_token]
+            tokens.append(match)
+            start, root = end, self._cont_root
         return tokens
 
     @staticmethod
@@ -181,6 +717,176 @@ class WordPieceTokenizer:
         return "".join(out)
 
 
+# ---------------------------------------------------------------------------
+# Binary vocabulary format
+# ---------------------------------------------------------------------------
+#
+# A section file (see _common) with magic "WPVOCAB1". Arrays:
+#   strings      utf-8 bytes of every token, sorted bytewise
+#   offsets      uint32[n + 1]   token i is strings[offsets[i]:offsets[i + 1]]
+#   ids          int32[n]        vocabulary id of sorted token i
+#   id_index     int32[max_id+1] sorted position of each id, -1 if unused
+#   edge_start   uint32[nodes+1] children of node k are edges [start[k], start[k+1])
+#   edge_chars   uint32[edges]   child code point, ascending within a node
+#   edge_targets uint32[edges]   child node index
+#   terminal     int32[nodes]    sorted position of the token ending here, or -1
+#
+# Node 0 is the word-initial trie root; header["cont_root"] is the "##" root.
+
+_VOCAB_MAGIC = b"WPVOCAB1"
+_VOCAB_SECTIONS = [
+    ("strings", "B"), ("offsets", "I"), ("ids", "i"), ("id_index", "i"),
+    ("edge_start", "I"), ("edge_chars", "I"), ("edge_targets", "I"), ("terminal", "i"),
+]
+
+
+def _write_vocab_file(path: str, tokenizer: WordPieceTokenizer) -> None:
+    encoded = sorted((tok.encode("utf-8"), idx) for tok, idx in tokenizer.vocab.items())
+    position = {raw.decode("utf-8"): i for i, (raw, _) in enumerate(encoded)}
+
+    offsets = array("I", [0])
+    for raw, _ in encoded:
+        offsets.append(offsets[-1] + len(raw))
+    ids = array("i", [idx for _, idx in encoded])
+    id_index = array("i", [-1]) * (max(ids, default=-1) + 1)
+    for i, idx in enumerate(ids):
+        id_index[idx] = i
+
+    # Flatten both tries breadth-first into CSR-style edge arrays.
+    root, cont_root = _build_tries(dict(tokenizer.vocab))
+    nodes: List[dict] = [root, cont_root]
+    edge_start, edge_chars, edge_targets = array("I"), array("I"), array("I")
+    terminal = array("i")
+    k = 0
+    while k < len(nodes):
+        node = nodes[k]
+        edge_start.append(len(edge_chars))
+        terminal.append(position[node[_TRIE_END]] if _TRIE_END in node else -1)
+        for c in sorted(ch for ch in node if ch != _TRIE_END):
+            edge_chars.append(ord(c))
+            edge_targets.append(len(nodes))
+            nodes.append(node[c])
+        k += 1
+    edge_start.append(len(edge_chars))
+
+    arrays = {
+        "strings": array("B", b"".join(raw for raw, _ in encoded)), "offsets": offsets,
+        "ids": ids, "id_index": id_index, "edge_start": edge_start,
+        "edge_chars": edge_chars, "edge_targets": edge_targets, "terminal": terminal,
+    }
+    header = {
+        "special_tokens": tokenizer.special_tokens, "unk_token": tokenizer.unk_token,
+        "max_chars_per_word": tokenizer.max_chars_per_word, "cont_root": 1,
+    }
+    write_sections(path, _VOCAB_MAGIC, _VOCAB_SECTIONS, arrays, header)
+
+
+class _VocabFile(SectionFile):
+    """Typed, read-only views over a binary vocabulary file."""
+
+    MAGIC = _VOCAB_MAGIC
+    SECTIONS = _VOCAB_SECTIONS
+    KIND = "WordPiece vocabulary"
+
+    def token(self, position: int) -> str:
+        return str(self.strings[self.offsets[position]:self.offsets[position + 1]], "utf-8")
+
+    def find(self, token: str) -> int:
+        """Binary-search the sorted string table; return the position or -1."""
+        raw = token.encode("utf-8")
+        lo, hi = 0, len(self.ids)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            candidate = bytes(self.strings[self.offsets[mid]:self.offsets[mid + 1]])
+            if candidate < raw:
+                lo = mid + 1
+            elif candidate == raw:
+                return mid
+            else:
+                hi = mid
+        return -1
+
+
+class _MappedVocab(Mapping):
+    """``{token: id}`` view backed by a :class:`_VocabFile`."""
+
+    def __init__(self, data: _VocabFile):
+        self._data = data
+
+    def __getitem__(self, token: str) -> int:
+        position = self._data.find(token)
+        if position < 0:
+            raise KeyError(token)
+        return self._data.ids[position]
+
+    def __iter__(self) -> Iterator[str]:
+        return (self._data.token(i) for i in range(len(self)))
+
+    def __len__(self) -> int:
+        return len(self._data.ids)
+
+
+class _MappedIdToToken(Mapping):
+    """``{id: token}`` view backed by a :class:`_VocabFile`."""
+
+    def __init__(self, data: _VocabFile):
+        self._data = data
+
+    def __getitem__(self, idx: int) -> str:
+        if not 0 <= idx < len(self._data.id_index) or self._data.id_index[idx] < 0:
+            raise KeyError(idx)
+        return self._data.token(self._data.id_index[idx])
+
+    def __iter__(self) -> Iterator[int]:
+        return (idx for idx, pos in enumerate(self._data.id_index) if pos >= 0)
+
+    def __len__(self) -> int:
+        return len(self._data.ids)
+
+
+class _MappedTrieNode:
+    """Trie node over the flattened edge arrays, duck-typed like the dict tries."""
+
+    __slots__ = ("_data", "_index")
+
+    def __init__(self, data: _VocabFile, index: int):
+        self._data = data
+        self._index = index
+
+    def get(self, char: str) -> Optional["_MappedTrieNode"]:
+        data = self._data
+        lo, hi = data.edge_start[self._index], data.edge_start[self._index + 1]
+        code = ord(char)
+        pos = bisect_left(data.edge_chars, code, lo, hi)
+        if pos < hi and data.edge_chars[pos] == code:
+            return _MappedTrieNode(data, data.edge_targets[pos])
+        return None
+
+    def __contains__(self, key: str) -> bool:
+        return key == _TRIE_END and self._data.terminal[self._index] >= 0
+
+    def __getitem__(self, key: str) -> str:
+        if key not in self:
+            raise KeyError(key)
+        return self._data.token(self._data.terminal[self._index])
+
+
+# ---------------------------------------------------------------------------
+# Process-pool workers
+# ---------------------------------------------------------------------------
+
+_WORKER_TOKENIZER: Optional[WordPieceTokenizer] = None
+
+
+def _init_encode_worker(tokenizer: WordPieceTokenizer) -> None:
+    global _WORKER_TOKENIZER
+    _WORKER_TOKENIZER = tokenizer
+
+
+def _encode_chunk(texts: Sequence[str]) -> List[List[int]]:
+    return [_WORKER_TOKENIZER.encode(text) for text in texts]
+
+
 # ---------------------------------------------------------------------------
 # Demo
 # ---------------------------------------------------------------------------